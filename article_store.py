@@ -0,0 +1,90 @@
+import os
+import time
+import shutil
+import numpy as np
+
+ARTICLE_STORE_PATH = "models/article_store"
+STORE_COLUMNS = ["clean_title", "clean_text"]
+SNIPPET_CHARS = 200  # Matches the preview length the frontend shows
+
+
+class ArticleStore:
+    """Read-only, memory-mapped column store for the corpus in final_nlp_data.pkl.
+
+    Each column is a UTF-8 blob plus an int64 offsets array (row i spans
+    offsets[i]:offsets[i + 1]). Both are opened with mmap, so every uvicorn worker
+    shares the same page cache instead of holding its own copy of the DataFrame.
+    """
+
+    def __init__(self, path=ARTICLE_STORE_PATH):
+        self.path = path
+        self._offsets = {}
+        self._blobs = {}
+        for column in STORE_COLUMNS:
+            self._offsets[column] = np.load(os.path.join(path, f"{column}.offsets.npy"), mmap_mode="r")
+            self._blobs[column] = np.memmap(os.path.join(path, f"{column}.blob"), dtype=np.uint8, mode="r")
+
+    def __len__(self):
+        return len(self._offsets[STORE_COLUMNS[0]]) - 1
+
+    def get(self, row_id, column, max_bytes=None):
+        offsets = self._offsets[column]
+        start, end = int(offsets[row_id]), int(offsets[row_id + 1])
+        if max_bytes is not None:
+            end = min(end, start + max_bytes)
+        return self._blobs[column][start:end].tobytes().decode("utf-8", errors="ignore")
+
+    def snippet(self, row_id, length=SNIPPET_CHARS):
+        text = self.get(row_id, "clean_text", max_bytes=length * 4 + 4)  # Enough bytes for `length` UTF-8 chars
+        if len(text) <= length:
+            return text
+        return text[:length].rsplit(" ", 1)[0] + "..."
+
+    def record(self, row_id, full_text=False):
+        record = {"row_id": int(row_id), "clean_title": self.get(row_id, "clean_title")}
+        if full_text:
+            record["clean_text"] = self.get(row_id, "clean_text")
+        else:
+            record["snippet"] = self.snippet(row_id)
+        return record
+
+    def records(self, row_ids, full_text=False):
+        return [self.record(row_id, full_text) for row_id in row_ids]
+
+    @classmethod
+    def build(cls, data_path="final_nlp_data.pkl", path=ARTICLE_STORE_PATH):
+        """Write the store from the pickled DataFrame into a temp dir and swap it into place"""
+        import pandas as pd
+
+        df = pd.read_pickle(data_path)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+
+        for column in STORE_COLUMNS:
+            offsets = np.zeros(len(df) + 1, dtype=np.int64)
+            with open(os.path.join(tmp_path, f"{column}.blob"), "wb") as blob:
+                for i, value in enumerate(df[column].fillna("").astype(str)):
+                    encoded = value.encode("utf-8")
+                    blob.write(encoded)
+                    offsets[i + 1] = offsets[i] + len(encoded)
+            np.save(os.path.join(tmp_path, f"{column}.offsets.npy"), offsets)
+
+        old_path = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)  # Workers that mapped the old files keep their mappings
+        print(f"Article store with {len(df)} rows written to {path}")
+
+    @classmethod
+    def open(cls, path=ARTICLE_STORE_PATH):
+        """Open a built store; building is a deploy step, so several workers never race to build it on first request"""
+        if not os.path.exists(os.path.join(path, f"{STORE_COLUMNS[-1]}.offsets.npy")):
+            raise FileNotFoundError(f"Article store not found at {path}. Run `python article_store.py` first.")
+        return cls(path)
+
+
+if __name__ == "__main__":
+    start = time.time()
+    ArticleStore.build()
+    print(f"Built in {time.time() - start:.1f}s")
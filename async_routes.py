@@ -0,0 +1,179 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Body, BackgroundTasks
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from models import User, Article, Like, ArticleNeighbor
+from schemas import UserCreate, UserLogin, UserResponse, ArticleCreate, ArticleResponse, LikeResponse
+from auth_module import password_hasher, HashingBusyError
+from feed_module import list_statement, list_item, afeed_page, arandom_articles, clamp_limit, FEED_PAGE_SIZE
+from neighbors_module import refresh_article_neighbors
+from recommend_module import store
+from personalize_module import profile_store
+from generate_module import indexing_pipeline
+from search_module import search_index
+
+# Same CRUD endpoints as main.py, on an AsyncSession so requests wait on the database without holding a threadpool worker
+router = APIRouter(prefix="/async", tags=["async"])
+
+
+async def neighbor_records(db, article_id):
+    result = await db.execute(
+        select(ArticleNeighbor.row_id, ArticleNeighbor.similarity)
+        .where(ArticleNeighbor.article_id == article_id)
+        .order_by(ArticleNeighbor.rank)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+    records = store.get().records([row_id for row_id, _ in rows])
+    for record, (_, similarity) in zip(records, rows):
+        record["similarity"] = similarity
+    return records
+
+
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = (await db.execute(select(User.id).where(User.email == user.email))).first()
+    await db.rollback()  # Give the connection back to the pool while scrypt runs
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    try:
+        hashed_pwd = await password_hasher.ahash(user.password)
+    except HashingBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    new_user = User(username=user.username, email=user.email, hashed_password=hashed_pwd)
+    db.add(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:  # Registered by a concurrent request while we were hashing
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    await db.refresh(new_user)
+    return new_user
+
+
+@router.post("/login", response_model=UserResponse)
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
+    if db_user:
+        db.expunge(db_user)  # Keeps its loaded columns through the rollback
+    await db.rollback()  # Give the connection back to the pool while scrypt runs
+
+    try:
+        # Unknown emails are checked against a dummy hash so they take as long as wrong passwords
+        matches, needs_rehash = await password_hasher.averify(user.password, db_user.hashed_password if db_user else None)
+        if matches and needs_rehash:
+            new_hash = await password_hasher.arehash(user.password)
+            await db.execute(update(User).where(User.id == db_user.id).values(hashed_password=new_hash))
+            await db.commit()
+    except HashingBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    if not matches:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return db_user
+
+
+@router.post("/articles/create", response_model=ArticleResponse)
+async def create_article(
+    article: ArticleCreate,
+    background_tasks: BackgroundTasks,
+    user_id: int = Body(..., embed=True),
+    db: AsyncSession = Depends(get_async_db)
+):
+    new_article = Article(title=article.title, content=article.content, author_id=user_id)
+    db.add(new_article)
+    await db.commit()
+    await db.refresh(new_article)  # Loads server-side defaults (created_at)
+    background_tasks.add_task(refresh_article_neighbors, new_article.id)
+    background_tasks.add_task(search_index.add, new_article.id, new_article.title, new_article.content)
+    if indexing_pipeline.loaded:
+        indexing_pipeline.get().enqueue(new_article.id, new_article.title, new_article.content)
+    return new_article
+
+
+@router.get("/articles")
+async def get_random_articles(count: int = FEED_PAGE_SIZE, db: AsyncSession = Depends(get_async_db)):
+    return await arandom_articles(db, clamp_limit(count))
+
+
+@router.get("/articles/feed")
+async def get_article_feed(after_id: Optional[int] = None, limit: int = FEED_PAGE_SIZE, db: AsyncSession = Depends(get_async_db)):
+    return await afeed_page(db, after_id, limit)
+
+
+@router.get("/articles/{article_id}")
+async def get_article_by_id(article_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(Article, User.username).join(User, Article.author_id == User.id).where(Article.id == article_id)
+    )
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Article not found")
+    article, author_name = row
+
+    recommendations = await neighbor_records(db, article.id)
+    if recommendations is None:  # Not precomputed yet; the TF-IDF search is CPU work, so it runs off the event loop
+        await asyncio.to_thread(refresh_article_neighbors, article.id)
+        recommendations = await neighbor_records(db, article.id) or []  # No hits leaves nothing stored
+
+    return {
+        "article": {
+            "id": article.id,
+            "title": article.title,
+            "content": article.content,
+            "author_name": author_name,
+            "like_count": article.like_count
+        },
+        "recommended": recommendations
+    }
+
+
+@router.post("/articles/{article_id}/like", response_model=LikeResponse)
+async def like_article(article_id: int, user_id: int = Body(...), db: AsyncSession = Depends(get_async_db)):
+    article = await db.get(Article, article_id)
+    if not article:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    new_like = Like(user_id=user_id, article_id=article_id)
+    db.add(new_like)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        result = await db.execute(delete(Like).where(Like.user_id == user_id, Like.article_id == article_id))
+        if result.rowcount:
+            await db.execute(update(Article).where(Article.id == article_id).values(like_count=Article.like_count - 1))
+        await db.commit()
+        await db.refresh(article)  # The rollback expired it, and lazy loads are not allowed on an AsyncSession
+        await asyncio.to_thread(profile_store.apply_like, user_id, article, False)
+        raise HTTPException(status_code=200, detail="Unliked the article")
+
+    await db.execute(update(Article).where(Article.id == article_id).values(like_count=Article.like_count + 1))
+    await db.commit()
+    await db.refresh(new_like)
+    await db.refresh(article)
+    await asyncio.to_thread(profile_store.apply_like, user_id, article, True)
+    return {
+        "user_id": new_like.user_id,
+        "article_id": new_like.article_id,
+        "created_at": new_like.created_at,
+        "like_count": article.like_count,
+    }
+
+
+@router.get("/users/{user_id}/articles")
+async def get_user_articles(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        list_statement().where(Article.author_id == user_id).order_by(Article.created_at.desc())
+    )
+    articles = result.all()
+
+    if not articles:
+        raise HTTPException(status_code=404, detail="No articles found for this user")
+
+    return [list_item(row) for row in articles]
@@ -0,0 +1,176 @@
+import os
+import hmac
+import base64
+import asyncio
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# scrypt cost: memory is ~128 * N * r bytes per hash, time grows linearly with N * r * p
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread (hashlib.scrypt releases the GIL) | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))  # Hashes computed at once
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))  # Queued + running before logins are rejected
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue is full and the request should be retried later."""
+
+
+def _scrypt(password, salt, n, r, p):
+    # Top-level so it can be sent to a process pool
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                          maxmem=max(64 * 1024 * 1024, 256 * n * r * p))
+
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def encode_hash(n, r, p, salt, key):
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(key)}"
+
+
+def is_legacy_hash(stored):
+    """Hashes written before scrypt: unsalted SHA-256 hex digests"""
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+
+def legacy_hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+class PasswordHasher:
+    """scrypt hashing and verification on a dedicated worker pool.
+
+    Requests past the pool size queue up to max_pending, after which HashingBusyError is
+    raised instead of letting a login burst starve the API's own threadpool. verify()
+    also reports whether the stored hash should be replaced: legacy SHA-256 digests and
+    hashes made with older cost parameters are upgraded on the next successful login.
+    Verifying against ``None`` (no such user) still pays for one scrypt, so response
+    times do not reveal which emails are registered.
+    """
+
+    def __init__(self, n=PASSWORD_SCRYPT_N, r=PASSWORD_SCRYPT_R, p=PASSWORD_SCRYPT_P,
+                 executor=PASSWORD_HASH_EXECUTOR, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING):
+        self.n, self.r, self.p = n, r, p
+        self.executor_kind = executor
+        self.dummy_hash = encode_hash(n, r, p, secrets.token_bytes(SALT_BYTES), secrets.token_bytes(KEY_BYTES))  # Matches nothing
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    pool = ProcessPoolExecutor if self.executor_kind == "process" else ThreadPoolExecutor
+                    self._executor = pool(max_workers=self.workers)
+        return self._executor
+
+    def _submit(self, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingBusyError("Too many logins in progress. Try again shortly.")
+            self.pending += 1
+        try:
+            future = self._get_executor().submit(_scrypt, *args)
+        except Exception:
+            self._done()
+            raise
+        future.add_done_callback(lambda _: self._done())
+        return future
+
+    def _done(self):
+        with self._lock:
+            self.pending -= 1
+
+    def _hash_future(self, password):
+        salt = secrets.token_bytes(SALT_BYTES)
+        future = self._submit(password, salt, self.n, self.r, self.p)
+        return future, lambda key: encode_hash(self.n, self.r, self.p, salt, key)
+
+    def _verify_future(self, password, stored):
+        """(future or None, finish) where finish(key) returns (matches, needs_rehash)"""
+        if is_legacy_hash(stored or ""):
+            matches = hmac.compare_digest(legacy_hash(password), stored)  # Cheap; no need for the pool
+            return None, lambda _: (matches, matches)
+        try:
+            salt, n, r, p, expected = self._split(stored)
+        except (AttributeError, ValueError):  # No such user, or a hash we cannot read: same cost, never matches
+            future = self._submit(password, *self._split(self.dummy_hash)[:4])
+            return future, lambda _: (False, False)
+        future = self._submit(password, salt, n, r, p)
+        outdated = (n, r, p) != (self.n, self.r, self.p)
+        return future, lambda computed: (hmac.compare_digest(computed, expected), outdated)
+
+    @staticmethod
+    def _split(stored):
+        """(salt, n, r, p, key) of an encoded scrypt hash; ValueError for anything else"""
+        scheme, n, r, p, salt, key = stored.split("$")
+        if scheme != "scrypt":
+            raise ValueError(f"Unknown hash scheme {scheme!r}")
+        return _unb64(salt), int(n), int(r), int(p), _unb64(key)
+
+    def hash(self, password):
+        future, finish = self._hash_future(password)
+        self.hashed += 1
+        return finish(future.result())
+
+    def verify(self, password, stored):
+        """(matches, needs_rehash) for a password against a stored hash, or None for an unknown user"""
+        future, finish = self._verify_future(password, stored)
+        self.verified += 1
+        return finish(future.result() if future else None)
+
+    async def ahash(self, password):
+        future, finish = self._hash_future(password)
+        self.hashed += 1
+        return finish(await asyncio.wrap_future(future))
+
+    async def averify(self, password, stored):
+        future, finish = self._verify_future(password, stored)
+        self.verified += 1
+        return finish(await asyncio.wrap_future(future) if future else None)
+
+    async def arehash(self, password):
+        """ahash for a login whose verify() asked for an upgrade; counted separately"""
+        stored = await self.ahash(password)
+        self.rehashed += 1
+        return stored
+
+    def stats(self):
+        return {
+            "scrypt": {"n": self.n, "r": self.r, "p": self.p},
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher()
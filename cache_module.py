@@ -0,0 +1,198 @@
+import os
+import time
+import atexit
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_DIR = os.getenv("CACHE_DIR")  # Set to enable the on-disk tier, e.g. CACHE_DIR=cache
+CACHE_FLUSH_INTERVAL = float(os.getenv("CACHE_FLUSH_INTERVAL", "1"))  # Seconds between batched writes to the disk tier
+
+
+def normalize_query(text):
+    """Lowercase and collapse whitespace so trivially different queries share a cache entry"""
+    return " ".join(str(text).lower().split())
+
+
+def cache_key(*parts):
+    return "\x1f".join(str(part) for part in parts)
+
+
+class DiskTier:
+    """SQLite file (WAL mode) shared by every worker process, bounded to ``max_entries``.
+
+    Writes are buffered and flushed in one transaction by a background thread, so
+    callers never wait on the disk. Each thread gets its own connection; WAL lets
+    readers in all processes proceed while one of them writes. After each flush,
+    expired entries are dropped and, if still over the bound, those closest to expiry.
+    """
+
+    def __init__(self, path, max_entries, flush_interval=CACHE_FLUSH_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending = {}  # key -> (expires_at, value) not yet written
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flushes = 0
+        db = self._db()
+        db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL)")
+        db.execute("CREATE INDEX IF NOT EXISTS ix_entries_expires_at ON entries (expires_at)")
+        db.commit()
+        threading.Thread(target=self._run, name=f"cache-flush-{os.path.basename(path)}", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; a crash may only lose the last flush
+        return db
+
+    def get(self, key, now):
+        with self._pending_lock:
+            entry = self._pending.get(key)
+        if entry is None:
+            row = self._db().execute("SELECT expires_at, value FROM entries WHERE key = ?", (key,)).fetchone()
+            entry = (row[0], pickle.loads(row[1])) if row else None
+        return entry if entry is not None and entry[0] > now else None
+
+    def set(self, key, entry):
+        with self._pending_lock:
+            self._pending[key] = entry
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Cache flush to {self.path} failed: {e}")
+
+    def flush(self):
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            db = self._db()
+            with db:  # One transaction
+                db.executemany(
+                    "INSERT OR REPLACE INTO entries (key, expires_at, value) VALUES (?, ?, ?)",
+                    [(key, expires_at, pickle.dumps(value)) for key, (expires_at, value) in pending.items()],
+                )
+                db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+                excess = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    db.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires_at LIMIT ?)", (excess,))
+            self.flushes += 1
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending.clear()
+        with self._db() as db:
+            db.execute("DELETE FROM entries")
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class ResultCache:
+    """Size-bounded LRU cache with per-entry TTL and an optional SQLite disk tier.
+
+    The memory tier holds at most ``max_size`` entries; the disk tier keeps up to
+    ``disk_size`` unexpired entries so results survive restarts, are shared between
+    worker processes and are promoted back into memory on a hit.
+    """
+
+    def __init__(self, name, max_size=1024, ttl_seconds=3600, disk_path=None, disk_size=None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._disk = DiskTier(disk_path, disk_size or 10 * max(max_size, 1))
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        entry = self._disk.get(key, now) if self._disk is not None else None  # Outside the lock
+        with self._lock:
+            if entry is not None:
+                self._store(key, entry)
+                self.disk_hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        entry = (time.time() + self.ttl_seconds, value)
+        with self._lock:
+            self._store(key, entry)
+        if self._disk is not None:
+            self._disk.set(key, entry)  # Buffered; written by the flush thread
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.clear()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "disk_tier": self._disk is not None,
+            "disk_flushes": self._disk.flushes if self._disk is not None else None,
+        }
+
+
+def cache_from_env(name, max_size=1024, ttl_seconds=3600):
+    """Build a cache sized by <NAME>_CACHE_SIZE / <NAME>_CACHE_TTL, persisted under CACHE_DIR if set
+    (at most <NAME>_CACHE_DISK_SIZE entries, 10x the memory size by default)"""
+    prefix = name.upper()
+    disk_size = os.getenv(f"{prefix}_CACHE_DISK_SIZE")
+    return ResultCache(
+        name,
+        max_size=int(os.getenv(f"{prefix}_CACHE_SIZE", max_size)),
+        ttl_seconds=float(os.getenv(f"{prefix}_CACHE_TTL", ttl_seconds)),
+        disk_path=os.path.join(CACHE_DIR, f"{name}.sqlite3") if CACHE_DIR else None,
+        disk_size=int(disk_size) if disk_size else None,
+    )
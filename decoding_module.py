@@ -0,0 +1,182 @@
+import numpy as np
+
+from nextword_module import nextword_model, nextword_tokenizer, input_id_limit, max_seq_len
+from loader_module import lazy
+
+
+class StatefulDecoder:
+    """Next-word decoding that carries the LSTM state forward instead of re-reading the window.
+
+    The seed's padded window is run through the stacked LSTMs once (the "prime"), then
+    every generated word is a single timestep through the cells of the same layers, so
+    a word costs one step rather than 29. Rows are independent, so many seeds, or many
+    beams of one seed, are decoded together in one batched step.
+
+    The first predicted word is identical to ``generate_next_words``. After that the
+    window-based loop drops its oldest pad (or token) each step, while the state here
+    remembers everything since the seed; greedy outputs agree closely but not always
+    exactly (testing/benchmark_decoding.py reports the agreement rate).
+    """
+
+    def __init__(self, model, tokenizer, max_seq_len=max_seq_len):
+        import tensorflow as tf
+
+        self.tf = tf
+        self.tokenizer = tokenizer
+        self.window_size = max_seq_len - 1
+        self.id_limit = input_id_limit(model, tokenizer)
+
+        layers = [layer for layer in model.layers if not isinstance(layer, tf.keras.layers.Dropout)]
+        self.embedding = layers[0]
+        self.lstms = [layer for layer in layers if isinstance(layer, tf.keras.layers.LSTM)]
+        self.head = layers[layers.index(self.lstms[-1]) + 1:]  # Dense(relu) -> Dense(softmax)
+        self.cells = [lstm.cell for lstm in self.lstms]
+
+        # The same cells (and weights) wrapped to run a whole window at once and hand back their state
+        self._prime_rnns = [tf.keras.layers.RNN(cell, return_sequences=True, return_state=True) for cell in self.cells]
+        self._prime_fn = tf.function(self._prime_impl, reduce_retracing=True)
+        self._step_fn = tf.function(self._step_impl, reduce_retracing=True)
+
+        vocab_size = self.head[-1].units
+        self.invalid = np.ones(vocab_size, dtype=bool)  # Padding and ids the tokenizer cannot turn into words
+        valid_ids = [i for i in tokenizer.index_word if 0 < i < vocab_size]
+        self.invalid[valid_ids] = False
+
+    def _prime_impl(self, windows):
+        x = self.embedding(windows)
+        mask = self.embedding.compute_mask(windows)
+        states = []
+        for rnn in self._prime_rnns:
+            x, h, c = rnn(x, mask=mask, training=False)
+            states += [h, c]
+        x = x[:, -1]
+        for layer in self.head:
+            x = layer(x, training=False)
+        return x, states
+
+    def _step_impl(self, ids, keep, states):
+        """One timestep for every row; rows with keep=False leave their state untouched"""
+        tf = self.tf
+        x = self.embedding(ids)
+        keep = keep[:, None]
+        new_states = []
+        for i, cell in enumerate(self.cells):
+            h, c = states[2 * i], states[2 * i + 1]
+            _, (new_h, new_c) = cell(x, [h, c], training=False)
+            new_h, new_c = tf.where(keep, new_h, h), tf.where(keep, new_c, c)
+            new_states += [new_h, new_c]
+            x = new_h
+        for layer in self.head:
+            x = layer(x, training=False)
+        return x, new_states
+
+    def windows(self, seeds):
+        """Pre-padded, pre-truncated id windows, the same as pad_sequences in generate_next_words"""
+        windows = np.zeros((len(seeds), self.window_size), dtype=np.int32)
+        for row, ids in enumerate(self.tokenizer.texts_to_sequences(seeds)):
+            ids = ids[-self.window_size:]
+            if ids:
+                windows[row, -len(ids):] = ids
+        return windows
+
+    def prime(self, seeds):
+        probs, states = self._prime_fn(self.tf.constant(self.windows(seeds)))
+        return probs.numpy(), states
+
+    def step(self, ids, states):
+        """Feed the chosen ids; ids the embedding cannot take are skipped, as re-tokenizing would drop them"""
+        ids = np.asarray(ids, dtype=np.int32)
+        keep = ids < self.id_limit if self.id_limit else np.ones(len(ids), dtype=bool)
+        probs, states = self._step_fn(self.tf.constant(np.where(keep, ids, 0)), self.tf.constant(keep), states)
+        return probs.numpy(), states
+
+    def gather(self, states, rows):
+        return [self.tf.gather(state, rows) for state in states]
+
+    def log_probs(self, probs):
+        log_probs = np.log(np.maximum(probs, 1e-12))
+        log_probs[:, self.invalid] = -np.inf
+        return log_probs
+
+    def words(self, ids):
+        return [self.tokenizer.index_word[i] for i in ids]
+
+    def greedy(self, seeds, num_words=10):
+        probs, states = self.prime(seeds)
+        generated = []
+        for step in range(num_words):
+            next_ids = self.log_probs(probs).argmax(axis=1)
+            generated.append(next_ids)
+            if step < num_words - 1:
+                probs, states = self.step(next_ids, states)
+        columns = np.stack(generated, axis=1) if generated else np.zeros((len(seeds), 0), dtype=np.int64)
+        return [" ".join([seed] + self.words(row)) for seed, row in zip(seeds, columns.tolist())]
+
+    def beam_search(self, seeds, num_words=10, beam_width=4):
+        """The beam_width most probable continuations of each seed, as (text, log probability), best first"""
+        n_seeds = len(seeds)
+        probs, states = self.prime(seeds)
+        log_probs = self.log_probs(probs)  # (seeds, vocab)
+        vocab_size = log_probs.shape[1]
+
+        beams = np.argsort(-log_probs, axis=1)[:, :beam_width]  # First expansion: one parent per seed
+        scores = np.take_along_axis(log_probs, beams, axis=1)
+        tokens = beams[:, :, None]
+        states = self.gather(states, np.repeat(np.arange(n_seeds), beam_width))
+
+        for _ in range(1, num_words):
+            probs, states = self.step(tokens[:, :, -1].ravel(), states)
+            candidates = scores[:, :, None] + self.log_probs(probs).reshape(n_seeds, beam_width, vocab_size)
+            flat = candidates.reshape(n_seeds, -1)
+            best = np.argpartition(-flat, beam_width - 1, axis=1)[:, :beam_width]
+            best = np.take_along_axis(best, np.argsort(-np.take_along_axis(flat, best, axis=1), axis=1), axis=1)
+            parents, next_ids = best // vocab_size, best % vocab_size
+
+            scores = np.take_along_axis(flat, best, axis=1)
+            tokens = np.concatenate([np.take_along_axis(tokens, parents[:, :, None], axis=1), next_ids[:, :, None]], axis=2)
+            states = self.gather(states, (np.arange(n_seeds)[:, None] * beam_width + parents).ravel())
+
+        return [
+            [(" ".join([seed] + self.words(beam)), float(score))
+             for beam, score in zip(tokens[i].tolist(), scores[i].tolist()) if np.isfinite(score)]
+            for i, seed in enumerate(seeds)
+        ]
+
+    def sample(self, seeds, num_words=10, top_k=0, top_p=1.0, temperature=1.0, seed=None):
+        """Random continuations drawn from the top_k words and/or the top_p probability mass at each step"""
+        rng = np.random.default_rng(seed)
+        probs, states = self.prime(seeds)
+        generated = []
+        for step in range(num_words):
+            next_ids = sample_rows(self.log_probs(probs), rng, top_k, top_p, temperature)
+            generated.append(next_ids)
+            if step < num_words - 1:
+                probs, states = self.step(next_ids, states)
+        columns = np.stack(generated, axis=1) if generated else np.zeros((len(seeds), 0), dtype=np.int64)
+        return [" ".join([seed_text] + self.words(row)) for seed_text, row in zip(seeds, columns.tolist())]
+
+
+def sample_rows(log_probs, rng, top_k=0, top_p=1.0, temperature=1.0):
+    """One id per row from temperature-scaled log probabilities, restricted by top-k then top-p"""
+    logits = log_probs / max(temperature, 1e-6)
+    if top_k and top_k < logits.shape[1]:
+        cutoff = -np.partition(-logits, top_k - 1, axis=1)[:, top_k - 1:top_k]
+        logits = np.where(logits >= cutoff, logits, -np.inf)
+
+    probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs /= probs.sum(axis=1, keepdims=True)
+    if top_p < 1.0:
+        order = np.argsort(-probs, axis=1)
+        sorted_probs = np.take_along_axis(probs, order, axis=1)
+        outside = np.cumsum(sorted_probs, axis=1) - sorted_probs >= top_p  # Mass before this word already reaches top_p
+        sorted_probs[outside] = 0
+        probs = np.zeros_like(probs)
+        np.put_along_axis(probs, order, sorted_probs, axis=1)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+    draws = rng.random((len(probs), 1))
+    return np.minimum((np.cumsum(probs, axis=1) < draws).sum(axis=1), probs.shape[1] - 1)
+
+
+nextword_decoder = lazy("nextword_decoder", lambda: StatefulDecoder(nextword_model.get(), nextword_tokenizer.get()),
+                        required=False)
@@ -0,0 +1,188 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))  # Recent query embeddings kept in memory
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))  # How long a batch waits for company
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch (fp32) | onnx | onnx-int8
+ONNX_MODEL_DIR = os.getenv("EMBEDDING_ONNX_DIR", "models/minilm_onnx")
+ONNX_QUANTIZATION = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx2")  # arm64 | avx2 | avx512 | avx512_vnni
+
+
+def onnx_file_name(backend):
+    return f"onnx/model_qint8_{ONNX_QUANTIZATION}.onnx" if backend == "onnx-int8" else "onnx/model.onnx"
+
+
+def export_onnx_model(output_dir=ONNX_MODEL_DIR, quantization_config=ONNX_QUANTIZATION):
+    """Export MiniLM to ONNX and write a dynamically int8-quantized copy next to it"""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(EMBEDDING_MODEL, backend="onnx")  # Converts the fp32 weights to ONNX on load
+    model.save_pretrained(output_dir)
+    export_dynamic_quantized_onnx_model(model, quantization_config, output_dir)
+    print(f"Exported ONNX embedder to {output_dir}")
+
+
+def sentence_transformer_args(backend=EMBEDDING_BACKEND):
+    """Model path and SentenceTransformer kwargs for the configured inference backend"""
+    if backend == "torch":
+        return EMBEDDING_MODEL, {}
+    if backend not in ("onnx", "onnx-int8"):
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    if not os.path.exists(os.path.join(ONNX_MODEL_DIR, onnx_file_name(backend))):
+        export_onnx_model()
+    return ONNX_MODEL_DIR, {"backend": "onnx", "model_kwargs": {"file_name": onnx_file_name(backend)}}
+
+
+def load_sentence_transformer(backend=EMBEDDING_BACKEND):
+    from sentence_transformers import SentenceTransformer
+    model_path, kwargs = sentence_transformer_args(backend)
+    return SentenceTransformer(model_path, **kwargs)
+
+
+def load_base_embeddings(backend=EMBEDDING_BACKEND):
+    """LangChain embeddings object backed by the configured fp32, ONNX or int8 ONNX model"""
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    model_path, kwargs = sentence_transformer_args(backend)
+    return HuggingFaceEmbeddings(model_name=model_path, model_kwargs=kwargs)
+
+
+class EmbeddingService(Embeddings):
+    """Wraps an embeddings model with an LRU query cache and micro-batching of concurrent queries.
+
+    Queries that arrive within ``batch_window_ms`` of each other are embedded in a
+    single forward pass by a background worker, so N concurrent requests cost one
+    model call instead of N.
+    """
+
+    def __init__(self, base, cache_size=EMBEDDING_CACHE_SIZE, batch_window_ms=EMBEDDING_BATCH_WINDOW_MS,
+                 max_batch_size=EMBEDDING_MAX_BATCH):
+        self.base = base
+        self.cache_size = cache_size
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self.started_at = time.time()
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.model_seconds = 0.0
+        self._latencies = deque(maxlen=1000)  # Recent end-to-end query latencies in seconds
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)  # Bulk indexing is already batched by the caller
+
+    def embed_query(self, text):
+        return self._submit(text).result()
+
+    async def aembed_query(self, text):
+        return await asyncio.wrap_future(self._submit(text))
+
+    def _submit(self, text):
+        start = time.perf_counter()
+        self.requests += 1
+        future = Future()
+
+        with self._cache_lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+        if vector is not None:
+            self.cache_hits += 1
+            self._latencies.append(time.perf_counter() - start)
+            future.set_result(list(vector))
+            return future
+
+        self._ensure_worker()
+        self._queue.put((text, future, start))
+        return future
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch):
+        texts = list(dict.fromkeys(text for text, _, _ in batch))  # Identical in-flight queries share one row
+        start = time.perf_counter()
+        try:
+            vectors = self.base.embed_documents(texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        self.batches += 1
+        self.batched_texts += len(texts)
+        self.model_seconds += finished - start
+
+        by_text = dict(zip(texts, vectors))
+        with self._cache_lock:
+            for text, vector in by_text.items():
+                self._cache[text] = vector
+                self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        for text, future, submitted in batch:
+            self._latencies.append(finished - submitted)
+            future.set_result(list(by_text[text]))
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3) if latencies else None
+
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "cache_size": len(self._cache),
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+            "texts_per_second": round(self.batched_texts / self.model_seconds, 1) if self.model_seconds else 0.0,
+            "requests_per_second": round(self.requests / max(time.time() - self.started_at, 1e-9), 3),
+            "latency_p50_ms": percentile(0.50),
+            "latency_p99_ms": percentile(0.99),
+            "queue_depth": self._queue.qsize(),
+        }
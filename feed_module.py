@@ -0,0 +1,117 @@
+import os
+import random
+from sqlalchemy import func, select
+from dotenv import load_dotenv
+
+from models import User, Article
+
+load_dotenv()
+
+EXCERPT_CHARS = int(os.getenv("FEED_EXCERPT_CHARS", "200"))  # Preview length computed in SQL for list responses
+FEED_PAGE_SIZE = 10
+FEED_MAX_PAGE_SIZE = 100
+
+
+def list_columns():
+    """Title, author and a SQL-side excerpt; the full body never leaves the database"""
+    return (
+        Article.id,
+        Article.title,
+        func.substr(Article.content, 1, EXCERPT_CHARS + 1).label("excerpt"),  # One extra char tells if it was cut
+        User.username.label("author_name"),
+        Article.like_count,
+    )
+
+
+def list_query(db):
+    return db.query(*list_columns()).join(User, Article.author_id == User.id)
+
+
+def list_statement():
+    """Same as list_query, as a 2.0-style select for AsyncSession.execute"""
+    return select(*list_columns()).join(User, Article.author_id == User.id)
+
+
+def list_item(row):
+    item = dict(row._mapping)
+    if item["excerpt"] and len(item["excerpt"]) > EXCERPT_CHARS:  # Only when the content is longer than the excerpt
+        item["excerpt"] = item["excerpt"][:EXCERPT_CHARS].rsplit(" ", 1)[0] + "..."
+    return item
+
+
+def clamp_limit(limit):
+    return max(1, min(limit, FEED_MAX_PAGE_SIZE))
+
+
+def page_filter(statement, after_id, limit):
+    if after_id is not None:
+        statement = statement.filter(Article.id < after_id)
+    return statement.order_by(Article.id.desc()).limit(limit + 1)  # One extra row says whether there is a next page
+
+
+def page_result(rows, limit):
+    items = [list_item(row) for row in rows]
+    next_after_id = items[limit - 1]["id"] if len(items) > limit else None
+    return {"articles": items[:limit], "next_after_id": next_after_id}
+
+
+def feed_page(db, after_id=None, limit=FEED_PAGE_SIZE):
+    """Newest-first page of the feed, keyed on the primary key instead of OFFSET.
+
+    Each page is a range seek on the id index (`id < after_id ORDER BY id DESC LIMIT n`),
+    so page 1000 costs the same as page 1.
+    """
+    limit = clamp_limit(limit)
+    return page_result(page_filter(list_query(db), after_id, limit), limit)
+
+
+async def afeed_page(db, after_id=None, limit=FEED_PAGE_SIZE):
+    limit = clamp_limit(limit)
+    result = await db.execute(page_filter(list_statement(), after_id, limit))
+    return page_result(result.all(), limit)
+
+
+def random_pivots(low, high, count):
+    return random.sample(range(low, high + 1), min(count, high - low + 1))
+
+
+def random_articles(db, count=FEED_PAGE_SIZE, max_attempts=3):
+    """Random sample via primary-key seeks rather than a table scan.
+
+    MIN/MAX(id) come straight off the index; each draw picks a random id in that range
+    and takes the first article at or after it (`id >= r ORDER BY id LIMIT 1`). Gaps
+    left by deleted rows slightly favour the article after the gap, which is fine for a
+    discovery feed.
+    """
+    low, high = db.query(func.min(Article.id), func.max(Article.id)).one()
+    if low is None:
+        return []
+
+    seen = {}
+    for _ in range(max_attempts):  # Retry draws that landed on an article we already have
+        missing = count - len(seen)
+        if missing <= 0:
+            break
+        for pivot in random_pivots(low, high, missing):
+            row = list_query(db).filter(Article.id >= pivot).order_by(Article.id).limit(1).first()
+            if row is not None and row.id not in seen:
+                seen[row.id] = list_item(row)
+    return list(seen.values())
+
+
+async def arandom_articles(db, count=FEED_PAGE_SIZE, max_attempts=3):
+    low, high = (await db.execute(select(func.min(Article.id), func.max(Article.id)))).one()
+    if low is None:
+        return []
+
+    seen = {}
+    for _ in range(max_attempts):
+        missing = count - len(seen)
+        if missing <= 0:
+            break
+        for pivot in random_pivots(low, high, missing):
+            result = await db.execute(list_statement().filter(Article.id >= pivot).order_by(Article.id).limit(1))
+            row = result.first()
+            if row is not None and row.id not in seen:
+                seen[row.id] = list_item(row)
+    return list(seen.values())
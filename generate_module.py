@@ -1,33 +1,101 @@
 import os
+import asyncio
 import pandas as pd
 import time
+import threading
+from contextlib import asynccontextmanager
 from langchain_groq import ChatGroq
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain.chains import create_retrieval_chain
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 # from sentence_transformers import SentenceTransformer
 # from langchain_core.documents import Document
 from dotenv import load_dotenv
+from cache_module import cache_from_env, cache_key, normalize_query
+from embedding_module import EmbeddingService, load_base_embeddings
+from indexing_module import IndexingPipeline, ReadWriteLock, resolve_snapshot_path
+from vector_index import VECTOR_STORE_PATH, apply_search_params
+from loader_module import lazy
 import warnings
 warnings.filterwarnings("ignore")
 
+# "direct" skips LangChain's chain graph (embed -> FAISS search -> prompt -> LLM); "chain" uses create_retrieval_chain
+GENERATION_PATH = os.getenv("GENERATION_PATH", "direct")
+
+
+class GenerationBusyError(Exception):
+    """Raised when the generation queue is full and the request should be retried later."""
+
+
+class GenerationLimiter:
+    """Caps concurrent LLM calls and rejects new work once too many requests are already waiting."""
+
+    def __init__(self, max_concurrent=4, max_queue=16):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise GenerationBusyError("Too many article generations in progress. Try again shortly.")
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
 class ArticleGenerator:
-    def __init__(self, groq_api_key=None, model_name="Llama3-8b-8192", vector_store_path="vector_db"):
+    def __init__(self, groq_api_key=None, model_name="Llama3-8b-8192", vector_store_path=VECTOR_STORE_PATH):
         load_dotenv()  # Load environment variables from .env file
         self.groq_api_key = groq_api_key or os.getenv('GROQ_API_KEY')  # Get Groq API key from argument or environment
         if not self.groq_api_key:
             raise ValueError("Groq API key not provided or found.")
         
+        self.model_name = model_name
         self.llm = ChatGroq(
             groq_api_key=self.groq_api_key,
             model_name=model_name
         )  # Initialize Groq LLM with API key and model name
+        self.cache = cache_from_env("generate", max_size=256, ttl_seconds=86400)  # Generated articles keyed on normalized title
+        self.limiter = GenerationLimiter(
+            max_concurrent=int(os.getenv("GENERATION_MAX_CONCURRENCY", "4")),
+            max_queue=int(os.getenv("GENERATION_MAX_QUEUE", "16"))
+        )  # Bounds in-flight LLM calls on the async path
+        self.generation_path = GENERATION_PATH
         self.vector_store = None
         self.vector_store_path = vector_store_path  # Path to save/load FAISS vector store
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")  # Embedding model for semantic search
+        self._chains = {}  # Retrieval chains memoized per num_similar_articles; they search via _retrieve, so reloads keep them
+        self._chains_lock = threading.Lock()
+        self.index_lock = ReadWriteLock()  # Searches share it; IndexingPipeline takes it exclusively to add vectors
+        self.embeddings = EmbeddingService(
+            load_base_embeddings()
+        )  # MiniLM on the EMBEDDING_BACKEND runtime, with query cache and micro-batching
 
         self.article_prompt = ChatPromptTemplate.from_template("""
         You are an expert article writer. Generate a well-structured article based on the provided title.
@@ -50,32 +118,185 @@ class ArticleGenerator:
         if not os.path.exists(self.vector_store_path):
             raise FileNotFoundError("Vector store not found. Run setup first.")
         self.vector_store = FAISS.load_local(
-            self.vector_store_path,
+            resolve_snapshot_path(self.vector_store_path),  # Latest snapshot written by IndexingPipeline, if any
             self.embeddings,
             allow_dangerous_deserialization=True  # ✅ Enable with caution
-        )  # Load FAISS vector store from disk
+        )  # Load FAISS vector store from disk (flat, IVF-Flat, IVF-PQ or HNSW)
+        apply_search_params(self.vector_store.index)  # nprobe / efSearch from configuration
         print("Vector DB loaded from disk.")
+        return self.vector_store
 
-    def generate_article(self, title, num_similar_articles=3):
+    def _cache_key(self, title, num_similar_articles):
+        return cache_key(normalize_query(title), num_similar_articles, self.model_name)
+
+    def _require_vector_store(self):
         if self.vector_store is None:
             raise ValueError("Vector store not loaded. Call load_vector_database() first.")
 
-        start = time.time()  # Start timing
+    def _get_chain(self, num_similar_articles):
+        chain = self._chains.get(num_similar_articles)
+        if chain is None:
+            self._require_vector_store()
+            with self._chains_lock:
+                chain = self._chains.get(num_similar_articles)
+                if chain is None:
+                    retriever = RunnableLambda(
+                        lambda inputs, k=num_similar_articles: self._retrieve(inputs["input"], k, {})
+                    )  # Retrieve similar articles through the locked search
+                    chain = create_retrieval_chain(retriever, create_stuff_documents_chain(self.llm, self.article_prompt))  # Create retrieval and generation chain
+                    self._chains[num_similar_articles] = chain
+        return chain
+
+    def _retrieve(self, title, num_similar_articles, timings):
+        self._require_vector_store()
+        start = time.perf_counter()
+        query_vector = self.embeddings.embed_query(title)
+        timings["embed_seconds"] = round(time.perf_counter() - start, 4)
+
+        start = time.perf_counter()
+        self.index_lock.acquire_read()
+        try:
+            documents = self.vector_store.similarity_search_by_vector(query_vector, k=num_similar_articles)
+        finally:
+            self.index_lock.release_read()
+        timings["search_seconds"] = round(time.perf_counter() - start, 4)
+        return documents
 
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": num_similar_articles})  # Retrieve similar articles
-        chain = create_retrieval_chain(retriever, create_stuff_documents_chain(self.llm, self.article_prompt))  # Create retrieval and generation chain
-        response = chain.invoke({"input": title})  # Generate article using LLM and similar articles
-        duration = time.time() - start  # Calculate generation time
+    def search_with_scores(self, query, k):
+        """(document, L2 distance) pairs for the k chunks nearest to the query"""
+        self._require_vector_store()
+        query_vector = self.embeddings.embed_query(query)
+        self.index_lock.acquire_read()
+        try:
+            return self.vector_store.similarity_search_with_score_by_vector(query_vector, k=k)
+        finally:
+            self.index_lock.release_read()
 
-        # print(response)
+    def _format_prompt(self, title, documents, timings):
+        start = time.perf_counter()
+        context = "\n\n".join(doc.page_content for doc in documents)  # Same layout the stuff-documents chain produces
+        messages = self.article_prompt.format_messages(context=context, input=title)
+        timings["prompt_seconds"] = round(time.perf_counter() - start, 4)
+        return messages
 
+    def _result(self, title, article, start, timings):
         return {
             "title": title,
-            "article": response["answer"],
-            "generation_time_seconds": round(duration, 2)
+            "article": article,
+            "generation_time_seconds": round(time.time() - start, 2),
+            "timings": timings
         }
 
+    def generate_article(self, title, num_similar_articles=3):
+        key = self._cache_key(title, num_similar_articles)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        start = time.time()  # Start timing
+        timings = {"path": self.generation_path}
+        if self.generation_path == "chain":
+            stage = time.perf_counter()
+            chain = self._get_chain(num_similar_articles)
+            timings["chain_build_seconds"] = round(time.perf_counter() - stage, 4)
+            stage = time.perf_counter()
+            article = chain.invoke({"input": title})["answer"]  # Generate article using LLM and similar articles
+            timings["chain_invoke_seconds"] = round(time.perf_counter() - stage, 4)
+        else:
+            messages = self._format_prompt(title, self._retrieve(title, num_similar_articles, timings), timings)
+            stage = time.perf_counter()
+            article = self.llm.invoke(messages).content
+            timings["llm_seconds"] = round(time.perf_counter() - stage, 4)
+
+        result = self._result(title, article, start, timings)
+        self.cache.set(key, result)
+        return dict(result)
+
+    async def agenerate_article(self, title, num_similar_articles=3):
+        key = self._cache_key(title, num_similar_articles)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)  # Cache hits never wait for a generation slot
+
+        async with self.limiter.slot():
+            start = time.time()
+            timings = {"path": self.generation_path}
+            if self.generation_path == "chain":
+                stage = time.perf_counter()
+                chain = self._get_chain(num_similar_articles)
+                timings["chain_build_seconds"] = round(time.perf_counter() - stage, 4)
+                stage = time.perf_counter()
+                response = await chain.ainvoke({"input": title})  # Awaits the LLM without holding a worker thread
+                article = response["answer"]
+                timings["chain_invoke_seconds"] = round(time.perf_counter() - stage, 4)
+            else:
+                documents = await asyncio.to_thread(self._retrieve, title, num_similar_articles, timings)
+                messages = self._format_prompt(title, documents, timings)
+                stage = time.perf_counter()
+                article = (await self.llm.ainvoke(messages)).content
+                timings["llm_seconds"] = round(time.perf_counter() - stage, 4)
+
+        result = self._result(title, article, start, timings)
+        self.cache.set(key, result)
+        return dict(result)
+
+    async def astream_article(self, title, num_similar_articles=3):
+        """Yield retrieval, token and done events as the LLM writes the article"""
+        key = self._cache_key(title, num_similar_articles)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield {"event": "retrieval", "retrieval_time_seconds": 0.0, "num_documents": 0, "cached": True}
+            yield {"event": "token", "text": cached["article"]}
+            yield {"event": "done", "retrieval_time_seconds": 0.0, "generation_time_seconds": 0.0, "cached": True}
+            return
+
+        self._require_vector_store()
+        async with self.limiter.slot():
+            overall_start = time.time()
+            timings = {"path": "direct"}
+            start = time.time()
+            documents = await asyncio.to_thread(self._retrieve, title, num_similar_articles, timings)
+            messages = self._format_prompt(title, documents, timings)
+            retrieval_time = time.time() - start
+            yield {"event": "retrieval", "retrieval_time_seconds": round(retrieval_time, 3), "num_documents": len(documents)}
+
+            start = time.time()
+            first_token_time = None
+            parts = []
+            async for chunk in self.llm.astream(messages):
+                if not chunk.content:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.time() - start
+                parts.append(chunk.content)
+                yield {"event": "token", "text": chunk.content}
+            generation_time = time.time() - start
+            timings["llm_seconds"] = round(generation_time, 4)
+
+        self.cache.set(key, self._result(title, "".join(parts), overall_start, timings))
+        yield {
+            "event": "done",
+            "retrieval_time_seconds": round(retrieval_time, 3),
+            "time_to_first_token_seconds": round(first_token_time or generation_time, 3),
+            "generation_time_seconds": round(generation_time, 3)
+        }
+
+generator = lazy("article_generator", ArticleGenerator)  # Loads the embedding model on first use
+
+
+def load_vector_database():
+    article_generator = generator.get()
+    article_generator.load_vector_database()
+    pipeline = IndexingPipeline(article_generator)  # Adds published articles to the live FAISS store
+    pipeline.start()  # Also queues DB articles published since the last snapshot
+    return pipeline
+
+indexing_pipeline = lazy("vector_database", load_vector_database)
+
 
-generator = ArticleGenerator()  # Instantiate the article generator
-# generator.load_vector_database()  # Load the vector database
-# generator.generate_article("AI in HealthCare", num_similar_articles=3)  # Generate article based on title
\ No newline at end of file
+def get_ready_generator():
+    """The generator with its vector store loaded"""
+    indexing_pipeline.get()
+    return generator.get()
+# generator.get().load_vector_database()  # Load the vector database
+# generator.get().generate_article("AI in HealthCare", num_similar_articles=3)  # Generate article based on title
@@ -0,0 +1,123 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from cache_module import normalize_query
+from recommend_module import tfidf, index, store
+from recommend_index import valid_hits
+from generate_module import get_ready_generator
+from article_store import SNIPPET_CHARS
+
+load_dotenv()
+
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")  # rrf (reciprocal rank fusion) | weighted
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "0.5"))  # Semantic gets 1 - this
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # Results taken from each side before fusing
+RRF_K = 60  # Standard reciprocal rank fusion damping constant
+
+
+def article_key(record):
+    """Identity of the article behind a candidate: its corpus row, else its DB id, else (notebook-built stores) its title"""
+    if record.get("row_id") is not None:
+        return ("row", int(record["row_id"]))
+    if record.get("article_id") is not None:
+        return ("article", int(record["article_id"]))
+    return ("title", normalize_query(record.get("clean_title", "")))
+
+
+def lexical_candidates(query, depth):
+    """TF-IDF neighbors as (key, score, record), best first"""
+    similarities, indices = index.get().search(tfidf.get().transform([query]), depth)
+    article_store = store.get()
+    candidates = []
+    for row_id, similarity in valid_hits(indices[0], similarities[0]):
+        record = article_store.record(row_id)
+        candidates.append((article_key(record), similarity, record))
+    return candidates
+
+
+def semantic_candidates(query, depth):
+    """MiniLM/FAISS neighbors as (key, score, record), one entry per article, best first"""
+    candidates = []
+    seen = set()
+    for doc, distance in get_ready_generator().search_with_scores(query, depth):
+        record = {
+            "row_id": doc.metadata.get("row_id"),
+            "article_id": doc.metadata.get("article_id"),
+            "clean_title": doc.metadata.get("title", ""),
+        }
+        key = article_key(record)
+        if key in seen:
+            continue  # Several chunks of the same article; keep the closest
+        seen.add(key)
+        record["snippet"] = doc.page_content.split("\n\n", 1)[-1][:SNIPPET_CHARS]
+        candidates.append((key, 1 - float(distance) / 2, record))  # Squared L2 between unit vectors is 2 - 2cos, so 1 - d/2 is the cosine
+    return candidates
+
+
+class HybridRecommender:
+    """Runs the lexical (TF-IDF) and semantic (FAISS) lookups in parallel and fuses their rankings.
+
+    Candidates are matched across the two indexes by corpus row (or DB article id),
+    and each article counts at most once per side. Only chunks from a notebook-built
+    vector store, which records titles alone, fall back to matching by title.
+    """
+
+    def __init__(self, method=HYBRID_FUSION, lexical_weight=HYBRID_LEXICAL_WEIGHT, depth=HYBRID_CANDIDATES):
+        self.method = method
+        self.lexical_weight = lexical_weight
+        self.depth = depth
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid")
+
+    def fuse(self, lexical, semantic, top_k, method=None):
+        method = method or self.method
+        fused = {}
+        lexical_titles = {}
+        for key, _, record in reversed(lexical):  # The best-ranked row wins when titles repeat
+            lexical_titles[("title", normalize_query(record["clean_title"]))] = key
+        for source, weight, candidates in (
+            ("lexical", self.lexical_weight, lexical),
+            ("semantic", 1 - self.lexical_weight, semantic),
+        ):
+            seen = set()
+            for rank, (key, score, record) in enumerate(candidates):
+                key = lexical_titles.get(key, key)  # Title-only semantic hits join the lexical row of that title
+                if key in seen:
+                    continue  # Already scored from this side at a better rank
+                seen.add(key)
+                # Lexical candidates are added first, so matches keep the corpus record with its row_id
+                entry = fused.setdefault(key, {"record": record, "score": 0.0, "lexical_score": None, "semantic_score": None})
+                entry[f"{source}_score"] = round(score, 4)
+                if method == "rrf":
+                    entry["score"] += 1 / (RRF_K + rank + 1)
+                else:
+                    entry["score"] += weight * score
+
+        ranked = sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[:top_k]
+        return [
+            {**entry["record"], "score": round(entry["score"], 6),
+             "lexical_score": entry["lexical_score"], "semantic_score": entry["semantic_score"]}
+            for entry in ranked
+        ]
+
+    def recommend(self, query, top_k=5, method=None):
+        start = time.perf_counter()
+        timings = {}
+
+        def timed(name, fn):
+            stage = time.perf_counter()
+            result = fn(query, self.depth)
+            timings[f"{name}_seconds"] = round(time.perf_counter() - stage, 4)
+            return result
+
+        lexical_future = self._pool.submit(timed, "lexical", lexical_candidates)
+        semantic_future = self._pool.submit(timed, "semantic", semantic_candidates)
+        lexical, semantic = lexical_future.result(), semantic_future.result()
+
+        results = self.fuse(lexical, semantic, top_k, method)
+        timings["total_seconds"] = round(time.perf_counter() - start, 4)
+        return {"query": query, "method": method or self.method, "recommendations": results, "timings": timings}
+
+
+hybrid_recommender = HybridRecommender()
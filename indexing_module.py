@@ -0,0 +1,290 @@
+import os
+import time
+import queue
+import shutil
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VECTOR_SNAPSHOT_INTERVAL = float(os.getenv("VECTOR_SNAPSHOT_INTERVAL", "300"))  # Max seconds between snapshots
+VECTOR_SNAPSHOT_EVERY = int(os.getenv("VECTOR_SNAPSHOT_EVERY", "50"))  # Snapshot early after this many new articles
+VECTOR_CATCH_UP_INTERVAL = float(os.getenv("VECTOR_CATCH_UP_INTERVAL", "60"))  # Seconds between DB checks for unindexed articles
+VECTOR_SNAPSHOTS_KEPT = 2
+CATCH_UP_BATCH = 500  # Articles fetched per query while catching up
+CATCH_UP_LOOKBACK = 1000  # Ids below the watermark rechecked each time, for inserts that commit out of id order
+RETRY_BASE_SECONDS = 60  # A failed article waits this long, doubling per failure...
+RETRY_MAX_SECONDS = 6 * 3600  # ...up to this
+
+CURRENT_POINTER = "CURRENT"  # File inside the vector store dir naming the live snapshot
+
+
+def resolve_snapshot_path(vector_store_path):
+    """Directory of the newest complete snapshot, or the store itself if none was ever taken"""
+    pointer = os.path.join(vector_store_path, CURRENT_POINTER)
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            snapshot = os.path.join(vector_store_path, f.read().strip())
+        if os.path.exists(os.path.join(snapshot, "index.faiss")):
+            return snapshot
+    return vector_store_path
+
+
+class ReadWriteLock:
+    """Many concurrent readers (searches) or one writer (index add / snapshot copy)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class IndexingPipeline:
+    """Embeds newly published articles in the background and adds them to the live FAISS store.
+
+    Embedding happens outside the index lock, so searches only wait for the
+    in-memory add itself. Snapshots copy the index under the lock, write it to a
+    fresh directory and then atomically repoint ``CURRENT`` at it. Every
+    ``catch_up_interval`` seconds the DB is read past the highest article id seen,
+    which picks up articles published through other workers; articles whose
+    embedding failed are retried with exponential backoff.
+    """
+
+    def __init__(self, generator, snapshot_interval=VECTOR_SNAPSHOT_INTERVAL, snapshot_every=VECTOR_SNAPSHOT_EVERY,
+                 catch_up_interval=VECTOR_CATCH_UP_INTERVAL):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        self.generator = generator
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_every = snapshot_every
+        self.catch_up_interval = catch_up_interval
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)  # Same chunking as the notebook build
+        self._queue = queue.Queue()
+        self._worker = None
+        self._snapshot_lock = threading.Lock()
+        self.indexed_ids = set()
+        self._queued_ids = set()  # Enqueued but not yet indexed, so catch-ups do not queue them twice
+        self._ids_lock = threading.Lock()
+        self._failures = {}  # article_id -> (failed attempts, time of next retry)
+        self.watermark = 0  # Highest DB article id read so far
+        self.last_catch_up = 0.0
+        self.pending_since_snapshot = 0
+        self.last_snapshot = time.time()
+        self.indexed_count = 0
+        self.failed_count = 0
+
+    def start(self):
+        self.indexed_ids = {
+            doc.metadata["article_id"]
+            for doc in self.generator.vector_store.docstore._dict.values()
+            if "article_id" in doc.metadata
+        }
+        self.watermark = max(self.indexed_ids, default=0) or self._db_max_id()
+        self._worker = threading.Thread(target=self._run, name="vector-indexer", daemon=True)
+        self._worker.start()
+        self.catch_up()
+
+    @staticmethod
+    def _db_max_id():
+        """Watermark for a store without article_id metadata (notebook builds): it already covers the corpus"""
+        from sqlalchemy import func
+        from database import SessionLocal
+        from models import Article
+
+        db = SessionLocal()
+        try:
+            return db.query(func.max(Article.id)).scalar() or 0
+        finally:
+            db.close()
+
+    def enqueue(self, article_id, title, content):
+        with self._ids_lock:
+            if article_id in self.indexed_ids or article_id in self._queued_ids:
+                return
+            self._queued_ids.add(article_id)
+        self._queue.put((article_id, title, content))
+
+    def catch_up(self, lookback=CATCH_UP_LOOKBACK):
+        """Queue DB articles past the watermark that are not indexed yet, plus failures due a retry; returns how many"""
+        from database import SessionLocal
+        from models import Article
+
+        now = time.time()
+        db = SessionLocal()
+        try:
+            ids = [article_id for (article_id,) in db.query(Article.id).filter(Article.id > self.watermark - lookback)]
+            with self._ids_lock:
+                due = {article_id for article_id, (_, retry_at) in self._failures.items() if retry_at <= now}
+                missing = sorted(
+                    ({article_id for article_id in ids if article_id not in self._failures} | due)
+                    - self.indexed_ids - self._queued_ids
+                )
+            for start in range(0, len(missing), CATCH_UP_BATCH):
+                rows = (
+                    db.query(Article.id, Article.title, Article.content)
+                    .filter(Article.id.in_(missing[start:start + CATCH_UP_BATCH]))
+                    .order_by(Article.id)
+                    .all()
+                )
+                for article_id, title, content in rows:
+                    self.enqueue(article_id, title, content)
+                with self._ids_lock:  # Failed articles deleted since are not retried
+                    for article_id in set(missing[start:start + CATCH_UP_BATCH]) - {row.id for row in rows}:
+                        self._failures.pop(article_id, None)
+        finally:
+            db.close()
+        self.watermark = max([self.watermark, *ids])
+        self.last_catch_up = now
+        return len(missing)
+
+    def _record_failure(self, article_ids):
+        now = time.time()
+        with self._ids_lock:
+            for article_id in article_ids:
+                attempts = self._failures.get(article_id, (0, 0))[0] + 1
+                self._failures[article_id] = (attempts, now + min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=min(self.snapshot_interval, self.catch_up_interval))]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < 64:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._index_batch(batch)
+                except Exception as e:
+                    self.failed_count += len(batch)
+                    self._record_failure(article_id for article_id, _, _ in batch)
+                    print(f"Vector indexing failed for {len(batch)} articles, retrying with backoff: {e}")
+                finally:
+                    with self._ids_lock:
+                        self._queued_ids.difference_update(article_id for article_id, _, _ in batch)
+
+            if time.time() - self.last_catch_up >= self.catch_up_interval:
+                try:
+                    self.catch_up()
+                except Exception as e:
+                    print(f"Vector index catch-up failed: {e}")
+
+            due = time.time() - self.last_snapshot >= self.snapshot_interval
+            if self.pending_since_snapshot and (due or self.pending_since_snapshot >= self.snapshot_every):
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    print(f"Vector snapshot failed: {e}")
+
+    def _index_batch(self, batch):
+        texts = []
+        metadatas = []
+        article_ids = []
+        for article_id, title, content in batch:
+            if article_id in self.indexed_ids:
+                continue
+            for chunk in self.splitter.split_text(f"Title: {title}\n\n{content}"):
+                texts.append(chunk)
+                metadatas.append({"title": title, "article_id": article_id})
+            article_ids.append(article_id)
+        if not texts:
+            return
+
+        vectors = self.generator.embeddings.embed_documents(texts)  # The slow part, done without the index lock
+
+        lock = self.generator.index_lock
+        lock.acquire_write()
+        try:
+            self.generator.vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+        finally:
+            lock.release_write()
+
+        with self._ids_lock:
+            self.indexed_ids.update(article_ids)
+            for article_id in article_ids:
+                self._failures.pop(article_id, None)
+        self.indexed_count += len(article_ids)
+        self.pending_since_snapshot += len(article_ids)
+
+    def snapshot(self):
+        """Persist the live store to a new snapshot directory and atomically make it current"""
+        import faiss
+        from langchain_community.vectorstores import FAISS
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+
+        with self._snapshot_lock:
+            store = self.generator.vector_store
+            lock = self.generator.index_lock
+            lock.acquire_write()
+            try:
+                pending = self.pending_since_snapshot
+                copy = FAISS(
+                    store.embedding_function,
+                    faiss.clone_index(store.index),
+                    InMemoryDocstore(dict(store.docstore._dict)),
+                    dict(store.index_to_docstore_id),
+                )
+            finally:
+                lock.release_write()
+
+            base_path = self.generator.vector_store_path
+            name = f"snapshot-{int(time.time() * 1000)}"
+            copy.save_local(os.path.join(base_path, name))
+
+            pointer = os.path.join(base_path, CURRENT_POINTER)
+            with open(pointer + ".tmp", "w") as f:
+                f.write(name)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(pointer + ".tmp", pointer)  # Readers see the old or the new snapshot, never a partial one
+
+            self.pending_since_snapshot -= pending
+            self.last_snapshot = time.time()
+            self._prune_snapshots(base_path, keep=name)
+            print(f"Vector DB snapshot written to {name}.")
+
+    def _prune_snapshots(self, base_path, keep):
+        snapshots = sorted(d for d in os.listdir(base_path) if d.startswith("snapshot-"))
+        for name in snapshots[:-VECTOR_SNAPSHOTS_KEPT]:
+            if name != keep:
+                shutil.rmtree(os.path.join(base_path, name), ignore_errors=True)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "indexed": self.indexed_count,
+            "failed": self.failed_count,
+            "awaiting_retry": len(self._failures),
+            "watermark": self.watermark,
+            "seconds_since_catch_up": round(time.time() - self.last_catch_up, 1) if self.last_catch_up else None,
+            "pending_since_snapshot": self.pending_since_snapshot,
+            "seconds_since_snapshot": round(time.time() - self.last_snapshot, 1),
+            "vectors": self.generator.vector_store.index.ntotal if self.generator.vector_store else 0,
+        }
@@ -0,0 +1,88 @@
+import os
+import time
+import asyncio
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# eager: load everything before serving | background: serve at once, warm up in a thread | lazy: load on first use
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background")
+
+
+class LazyComponent:
+    """A model or index that is loaded once, on first use or by the warm-up thread, whichever comes first."""
+
+    def __init__(self, name, loader, required=True):
+        self.name = name
+        self._loader = loader
+        self.required = required  # Optional components are left out of warm-up and readiness
+        self._lock = threading.Lock()
+        self._value = None
+        self.loaded = False
+        self.load_seconds = None
+        self.error = None
+
+    def get(self):
+        if self.loaded:
+            return self._value
+        with self._lock:
+            if not self.loaded:  # Another thread may have finished loading while we waited
+                start = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                self.error = None
+                self.loaded = True
+                print(f"Loaded {self.name} in {self.load_seconds}s")
+        return self._value
+
+    async def aget(self):
+        """Like get(), but a first-time load runs in a worker thread instead of blocking the event loop"""
+        if self.loaded:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def status(self):
+        return {"loaded": self.loaded, "load_seconds": self.load_seconds, "error": self.error}
+
+
+components = {}  # name -> LazyComponent, in registration order
+
+
+def lazy(name, loader, required=True):
+    component = LazyComponent(name, loader, required)
+    components[name] = component
+    return component
+
+
+warm_up_state = {"started_at": None, "finished_at": None}
+
+
+def warm_up(names=None):
+    """Load components one after another (by default the required ones); failures are recorded and left for the
+    next get() to retry"""
+    warm_up_state["started_at"] = time.time()
+    for name in names or [name for name, component in components.items() if component.required]:
+        try:
+            components[name].get()
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+    warm_up_state["finished_at"] = time.time()
+
+
+def readiness():
+    started, finished = warm_up_state["started_at"], warm_up_state["finished_at"]
+    required = {name: component for name, component in components.items() if component.required}
+    return {
+        "ready": all(component.loaded for component in required.values()),
+        "startup_mode": STARTUP_MODE,
+        "warm_up_seconds": round(finished - started, 3) if started and finished else None,
+        "components": {name: component.status() for name, component in required.items()},
+        "optional_components": {
+            name: component.status() for name, component in components.items() if not component.required
+        },
+    }
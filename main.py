@@ -1,28 +1,40 @@
-from fastapi import FastAPI, HTTPException, Depends, Body
+from fastapi import FastAPI, HTTPException, Depends, Body, BackgroundTasks, Query
 from pydantic import BaseModel
 from typing import Optional, List
 
 # Import your modules
-from generate_module import generator
-# from nextword_module import generate_next_words, model as nextword_model, tokenizer, max_seq_len
-from recommend_module import recommend_articles
-from schemas import ArticleRequest, NextWordRequest, RecommendRequest, UserCreate, UserLogin, UserResponse, ArticleCreate, ArticleResponse, LikeResponse, GeneratedArticle
+from generate_module import generator, indexing_pipeline, GenerationBusyError
+from nextword_module import nextword_service, nextword_router
+from decoding_module import nextword_decoder
+from recommend_module import recommend_articles, recommend_articles_batch, recommend_cache
+from hybrid_module import hybrid_recommender
+from personalize_module import profile_store
+from feed_module import list_query, list_item, feed_page, random_articles, clamp_limit, FEED_PAGE_SIZE
+from loader_module import warm_up, readiness, STARTUP_MODE
+from auth_module import password_hasher, HashingBusyError
+from search_module import search_index, search_loader
+from neighbors_module import compute_neighbors, store_neighbors, lookup_neighbors, refresh_article_neighbors, rebuild_neighbor_table
+from schemas import ArticleRequest, NextWordRequest, RecommendRequest, HybridRecommendRequest, BatchRecommendRequest, UserCreate, UserLogin, UserResponse, ArticleCreate, ArticleResponse, LikeResponse, GeneratedArticle, MAX_TOP_K
 from models import User, Article, Like
 
 from database import SessionLocal
 from sqlalchemy.orm import Session
-from database import get_db
-import hashlib
-import random
+from sqlalchemy.exc import IntegrityError
+from database import get_db, pool_stats
+from async_routes import router as async_router
+import asyncio
+import json
+import time
+import threading
 
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse, JSONResponse
 
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
+MAX_BATCH_QUERIES = 10000
+BATCH_STREAM_THRESHOLD = 200  # Larger batches are streamed as NDJSON
+BATCH_CHUNK_SIZE = 256  # Queries vectorized per TF-IDF transform / index search, streamed or not
 
 # Initialize FastAPI
 app = FastAPI(title="AI Article Platform", description="API for article generation, next word prediction, and article recommendation", version="1.0")
@@ -38,41 +50,109 @@ app.add_middleware(
 
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
+app.include_router(async_router)
+
+async def get_generator():
+    await indexing_pipeline.aget()  # Generation needs the vector DB, which in turn loads the generator
+    return generator.get()
+
+
+def warm_up_and_backfill():
+    warm_up()
+    # Fill in neighbors for any article published while the table was not being maintained
+    rebuild_neighbor_table()
+
 
-# Load vector database at startup
+# Load models at startup according to STARTUP_MODE
 @app.on_event("startup")
 def startup_event():
-    try:
-        generator.load_vector_database()
-    except Exception as e:
-        raise RuntimeError(f"Error loading vector database: {str(e)}")
+    if STARTUP_MODE == "eager":
+        warm_up()
+        failed = {name: status["error"] for name, status in readiness()["components"].items() if status["error"]}
+        if failed:
+            raise RuntimeError(f"Error loading components: {failed}")
+        threading.Thread(target=rebuild_neighbor_table, daemon=True).start()
+    elif STARTUP_MODE == "background":
+        threading.Thread(target=warm_up_and_backfill, daemon=True).start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    if indexing_pipeline.loaded and indexing_pipeline.get().pending_since_snapshot:
+        indexing_pipeline.get().snapshot()
+
+
+@app.get("/ready")
+def ready():
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
 
 # Routes
 @app.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
-    if existing_user:
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    # async so the request waits on the hashing pool without holding a threadpool thread; DB calls go to threads
+    def email_taken():
+        taken = db.query(User.id).filter(User.email == user.email).first() is not None
+        db.rollback()  # Give the connection back to the pool while scrypt runs
+        return taken
+
+    if await asyncio.to_thread(email_taken):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pwd = hash_password(user.password)
+    try:
+        hashed_pwd = await password_hasher.ahash(user.password)
+    except HashingBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     new_user = User(username=user.username, email=user.email, hashed_password=hashed_pwd)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+
+    def save():
+        db.add(new_user)
+        try:
+            db.commit()
+        except IntegrityError:  # Registered by a concurrent request while we were hashing
+            db.rollback()
+            return False
+        db.refresh(new_user)
+        return True
+
+    if not await asyncio.to_thread(save):
+        raise HTTPException(status_code=400, detail="Email already registered")
     return new_user
 
 @app.post("/login", response_model=UserResponse)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    hashed_pwd = hash_password(user.password)
-    db_user = db.query(User).filter(User.email == user.email, User.hashed_password == hashed_pwd).first()
-    if not db_user:
+async def login(user: UserLogin, db: Session = Depends(get_db)):
+    # Salted hashes can't be matched in SQL
+    def find_user():
+        db_user = db.query(User).filter(User.email == user.email).first()
+        if db_user:
+            db.expunge(db_user)  # Keeps its loaded columns through the rollback
+        db.rollback()  # Give the connection back to the pool while scrypt runs
+        return db_user
+
+    db_user = await asyncio.to_thread(find_user)
+
+    try:
+        # Unknown emails are checked against a dummy hash so they take as long as wrong passwords
+        matches, needs_rehash = await password_hasher.averify(user.password, db_user.hashed_password if db_user else None)
+        if matches and needs_rehash:  # Legacy SHA-256 or older cost parameters; upgrade while we have the password
+            new_hash = await password_hasher.arehash(user.password)
+
+            def save_hash():
+                db.query(User).filter(User.id == db_user.id).update({User.hashed_password: new_hash})
+                db.commit()
+
+            await asyncio.to_thread(save_hash)
+    except HashingBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    if not matches:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return db_user
 
 @app.post("/articles/create", response_model=ArticleResponse)
 def create_article(
     article: ArticleCreate,
+    background_tasks: BackgroundTasks,
     user_id: int = Body(..., embed=True),  # later replace with session or token
     db: Session = Depends(get_db)
 ):
@@ -84,19 +164,37 @@ def create_article(
     db.add(new_article)
     db.commit()
     db.refresh(new_article)
+    background_tasks.add_task(refresh_article_neighbors, new_article.id)  # Only the new article needs neighbors
+    background_tasks.add_task(search_index.add, new_article.id, new_article.title, new_article.content)
+    if indexing_pipeline.loaded:  # Otherwise the pipeline's catch-up picks it up from the DB
+        indexing_pipeline.get().enqueue(new_article.id, new_article.title, new_article.content)  # Becomes retrieval context for generation
     return new_article
 
 @app.get("/articles")
-def get_random_articles(db: Session = Depends(get_db)):
-    articles = db.query(
-        Article.id,
-        Article.title,
-        Article.content,
-        User.username.label("author_name")
-    ).join(User, Article.author_id == User.id).all()
+def get_random_articles(count: int = FEED_PAGE_SIZE, db: Session = Depends(get_db)):
+    return random_articles(db, clamp_limit(count))
+
+
+@app.get("/articles/feed")
+def get_article_feed(after_id: Optional[int] = None, limit: int = FEED_PAGE_SIZE, db: Session = Depends(get_db)):
+    return feed_page(db, after_id, limit)
+
+@app.get("/search")
+def search_articles(q: str, page: int = 1, page_size: int = 10, prefix: bool = False, db: Session = Depends(get_db)):
+    """Ranked full-text search over DB articles; prefix=true treats the last word as a partial word (typeahead)"""
+    page, page_size = max(1, page), clamp_limit(page_size)
+    index = search_loader.get()
+    start = time.perf_counter()
+    total, hits = index.search(q, page, page_size, prefix)
+    took_ms = round(1000 * (time.perf_counter() - start), 3)
+
+    rows = {row.id: row for row in list_query(db).filter(Article.id.in_([article_id for article_id, _ in hits]))} if hits else {}
+    results = []
+    for article_id, score in hits:
+        if article_id in rows:  # Skip articles deleted since they were indexed
+            results.append({**list_item(rows[article_id]), "score": round(score, 4)})
+    return {"query": q, "total": total, "page": page, "page_size": page_size, "results": results, "took_ms": took_ms}
 
-    article_list = [dict(row._mapping) for row in articles]
-    return random.sample(article_list, min(len(article_list), 10))
 
 @app.get("/articles/{article_id}")
 def get_article_by_id(article_id: int, db: Session = Depends(get_db)):
@@ -104,97 +202,246 @@ def get_article_by_id(article_id: int, db: Session = Depends(get_db)):
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
-    recommended_df = recommend_articles(article.title, top_k=5)
-    recommendations = recommended_df.to_dict(orient="records")
+    recommendations = lookup_neighbors(db, article.id)
+    if recommendations is None:  # Not precomputed yet, fill the table for next time
+        store_neighbors(db, article.id, compute_neighbors([article.title])[0])
+        db.commit()
+        recommendations = lookup_neighbors(db, article.id) or []  # No hits leaves nothing stored
 
     return {
         "article": {
             "id": article.id,
             "title": article.title,
             "content": article.content,
-            "author_name": article.author.username
+            "author_name": article.author.username,
+            "like_count": article.like_count
         },
         "recommended": recommendations
     }
 
 @app.post("/articles/{article_id}/like", response_model=LikeResponse)
 def like_article(article_id: int, user_id: int = Body(...), db: Session = Depends(get_db)):
-    article = db.query(Article).filter(Article.id == article_id).first()
+    article = db.get(Article, article_id)
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
-    like = db.query(Like).filter(Like.user_id == user_id, Like.article_id == article_id).first()
-    if like:
-        db.delete(like)
+    # Insert first and let the unique (user_id, article_id) index decide whether this is a like or an unlike
+    new_like = Like(user_id=user_id, article_id=article_id)
+    db.add(new_like)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        removed = db.query(Like).filter(Like.user_id == user_id, Like.article_id == article_id).delete(synchronize_session=False)
+        if removed:  # A concurrent unlike may already have deleted it
+            db.query(Article).filter(Article.id == article_id).update(
+                {Article.like_count: Article.like_count - 1}, synchronize_session=False
+            )
         db.commit()
+        profile_store.apply_like(user_id, article, liked=False)
         raise HTTPException(status_code=200, detail="Unliked the article")
 
-    new_like = Like(user_id=user_id, article_id=article_id)
-    db.add(new_like)
+    db.query(Article).filter(Article.id == article_id).update(
+        {Article.like_count: Article.like_count + 1}, synchronize_session=False
+    )  # Computed in SQL, so concurrent likes cannot overwrite each other's count
     db.commit()
     db.refresh(new_like)
-    return new_like
+    db.refresh(article)
+    profile_store.apply_like(user_id, article, liked=True)  # Incremental update of the cached profile, if any
+    return {
+        "user_id": new_like.user_id,
+        "article_id": new_like.article_id,
+        "created_at": new_like.created_at,
+        "like_count": article.like_count,
+    }
 
 @app.get("/users/{user_id}/articles")
 def get_user_articles(user_id: int, db: Session = Depends(get_db)):
-    articles = (
-        db.query(Article, User.username)
-        .join(User, Article.author_id == User.id)
-        .filter(Article.author_id == user_id)
-        .order_by(Article.created_at.desc())
-        .all()
-    )
+    articles = list_query(db).filter(Article.author_id == user_id).order_by(Article.created_at.desc()).all()
 
     if not articles:
         raise HTTPException(status_code=404, detail="No articles found for this user")
 
-    return [
-        {
-            "id": a.id,
-            "title": a.title,
-            "content": a.content,
-            "author_name": username
-        }
-        for a, username in articles
-    ]
+    return [list_item(row) for row in articles]
+
+
+@app.get("/users/{user_id}/for-you")
+def get_for_you_feed(user_id: int, top_k: int = Query(10, ge=1, le=MAX_TOP_K), db: Session = Depends(get_db)):
+    recommendations = profile_store.recommend(db, user_id, top_k)
+    if recommendations is None:
+        raise HTTPException(status_code=404, detail="Like some articles to get personalized recommendations")
+    return {"user_id": user_id, "recommendations": recommendations}
 
 
 @app.post("/articles/generate", response_model=GeneratedArticle)
-def generate_article_content(
+async def generate_article_content(
     request: ArticleRequest,
-    user_id: int = Body(..., embed=True),
-    db: Session = Depends(get_db)
+    user_id: int = Body(..., embed=True)
 ):
     try:
-        result = generator.generate_article(request.title, request.num_similar_articles)
+        article_generator = await get_generator()
+        result = await article_generator.agenerate_article(request.title, request.num_similar_articles)
+    except GenerationBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
     return {
     "title": request.title,
     "content": result["article"],
-    "author_id": user_id
+    "author_id": user_id,
+    "timings": result.get("timings")
 }
 
 
-# @app.post("/predict-nextwords/")
-# def predict_next_words(request: NextWordRequest):
-#     try:
-#         result = generate_next_words(request.seed_text, nextword_model, tokenizer, max_seq_len, request.num_words)
-#         return {"input": request.seed_text, "output": result}
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
+@app.post("/predict-nextwords/")
+async def predict_next_words(request: NextWordRequest):
+    if request.strategy not in ("greedy", "beam", "sample"):
+        raise HTTPException(status_code=422, detail="strategy must be greedy, beam or sample")
+    try:
+        if request.strategy == "greedy":  # LSTM batched across requests, or the n-gram model when over budget
+            result, engine = await nextword_router.agenerate(request.seed_text, request.num_words, request.latency_budget_ms)
+            return {"input": request.seed_text, "output": result, "engine": engine}
+
+        decoder = await nextword_decoder.aget()
+        if request.strategy == "beam":
+            beams = await asyncio.to_thread(
+                decoder.beam_search, [request.seed_text], request.num_words, max(1, min(request.beam_width, 16))
+            )
+            return {"input": request.seed_text, "output": beams[0][0][0],
+                    "beams": [{"text": text, "log_prob": round(score, 4)} for text, score in beams[0]]}
+        samples = await asyncio.to_thread(
+            decoder.sample, [request.seed_text], request.num_words, request.top_k, request.top_p, request.temperature
+        )
+        return {"input": request.seed_text, "output": samples[0]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/predict-nextwords/stats")
+def nextword_stats():
+    stats = {"router": nextword_router.stats()}
+    if nextword_service.loaded:
+        stats.update(nextword_service.get().stats())
+    return stats
 
 @app.post("/recommend-articles/")
 def recommend(request: RecommendRequest):
     try:
-        results_df = recommend_articles(request.query, request.top_k)
+        results_df = recommend_articles(request.query, request.top_k, request.full_text)
         results = results_df.to_dict(orient="records")
         return {"query": request.query, "recommendations": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@app.post("/recommend-articles/hybrid")
+def recommend_hybrid(request: HybridRecommendRequest):
+    if request.method not in (None, "rrf", "weighted"):
+        raise HTTPException(status_code=400, detail="method must be 'rrf' or 'weighted'")
+    try:
+        return hybrid_recommender.recommend(request.query, request.top_k, request.method)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/recommend-articles/batch")
+def recommend_batch(request: BatchRecommendRequest):
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+
+    stream = request.stream if request.stream is not None else len(request.queries) > BATCH_STREAM_THRESHOLD
+    if not stream:
+        try:  # Chunked like the stream, so the dense query and score matrices stay BATCH_CHUNK_SIZE rows tall
+            results = []
+            for start in range(0, len(request.queries), BATCH_CHUNK_SIZE):
+                chunk = request.queries[start:start + BATCH_CHUNK_SIZE]
+                results.extend(recommend_articles_batch(chunk, request.top_k, request.full_text))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return {
+            "results": [
+                {"query": query, "recommendations": recommendations}
+                for query, recommendations in zip(request.queries, results)
+            ]
+        }
+
+    def ndjson_lines():
+        for start in range(0, len(request.queries), BATCH_CHUNK_SIZE):
+            chunk = request.queries[start:start + BATCH_CHUNK_SIZE]
+            try:
+                results = recommend_articles_batch(chunk, request.top_k, request.full_text)
+            except Exception as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+                return
+            for offset, (query, recommendations) in enumerate(zip(chunk, results)):
+                yield json.dumps({"index": start + offset, "query": query, "recommendations": recommendations}) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "recommend": recommend_cache.stats(),
+        "generate": generator.get().cache.stats() if generator.loaded else None
+    }
+
+
+@app.post("/articles/generate/stream")
+async def stream_article_content(
+    request: ArticleRequest,
+    user_id: int = Body(..., embed=True)
+):
+    try:
+        article_generator = await get_generator()
+        events = article_generator.astream_article(request.title, request.num_similar_articles)
+        first_event = await events.__anext__()  # Surface queue-full and load errors before the stream starts
+    except GenerationBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+
+    async def event_stream():
+        yield f"event: {first_event['event']}\ndata: {json.dumps(first_event)}\n\n"
+        try:
+            async for event in events:
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'event': 'error', 'detail': f'Generation failed: {str(e)}'})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/articles/generate/stats")
+def generation_stats():
+    return generator.get().limiter.stats() if generator.loaded else {"loaded": False}
+
+
+@app.get("/vector-index/stats")
+def vector_index_stats():
+    return indexing_pipeline.get().stats() if indexing_pipeline.loaded else {"loaded": False}
+
+
+@app.get("/embeddings/stats")
+def embedding_stats():
+    return generator.get().embeddings.stats() if generator.loaded else {"loaded": False}
+
+
+@app.get("/auth/stats")
+def auth_stats():
+    return password_hasher.stats()
+
+
+@app.get("/db/pool/stats")
+def db_pool_stats():
+    return pool_stats()
+
+
 @app.get("/", include_in_schema=False)
 def root():
     return RedirectResponse(url="/static/index.html")
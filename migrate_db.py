@@ -0,0 +1,88 @@
+# migrate_db.py
+
+from sqlalchemy import inspect, text
+
+from database import engine
+from models import Base, Article, Like, ArticleNeighbor
+
+
+def add_like_count(conn, inspector):
+    columns = {column["name"] for column in inspector.get_columns("articles")}
+    if "like_count" in columns:
+        return False
+    conn.execute(text("ALTER TABLE articles ADD COLUMN like_count INTEGER NOT NULL DEFAULT 0"))
+    return True
+
+
+def remove_duplicate_likes(conn):
+    """Keep the oldest row of each (user_id, article_id) pair so the unique index can be built"""
+    result = conn.execute(text(
+        "DELETE FROM likes WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM likes GROUP BY user_id, article_id) AS keep)"
+    ))  # The derived table lets MySQL delete from the table it is selecting from
+    return result.rowcount
+
+
+def remove_duplicate_neighbors(conn):
+    """Keep one row per (article_id, rank), left behind by concurrent first views before the unique index"""
+    rank = conn.dialect.identifier_preparer.quote_identifier("rank")  # Reserved in MySQL 8; quoted per dialect
+    result = conn.execute(text(
+        "DELETE FROM article_neighbors WHERE id NOT IN ("
+        f"SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM article_neighbors GROUP BY article_id, {rank}) AS keep)"
+    ))
+    return result.rowcount
+
+
+def drop_replaced_indexes(conn, inspector):
+    """Drop indexes superseded by a unique one on the same columns"""
+    existing = {index["name"] for index in inspector.get_indexes("article_neighbors")}
+    if "ix_article_neighbors_article_rank" in existing:
+        conn.execute(text("DROP INDEX ix_article_neighbors_article_rank" + (" ON article_neighbors" if conn.dialect.name == "mysql" else "")))
+        return ["ix_article_neighbors_article_rank"]
+    return []
+
+
+def backfill_like_counts(conn):
+    conn.execute(text(
+        "UPDATE articles SET like_count = "
+        "(SELECT COUNT(*) FROM likes WHERE likes.article_id = articles.id)"
+    ))
+
+
+def create_indexes(conn, inspector):
+    created = []
+    for table in (Article.__table__, Like.__table__, ArticleNeighbor.__table__):
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=conn)
+                created.append(index.name)
+    return created
+
+
+def migrate():
+    """Bring an existing database up to models.py; safe to run repeatedly"""
+    Base.metadata.create_all(bind=engine)  # New tables only; existing ones are altered below
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        if add_like_count(conn, inspector):
+            print("Added articles.like_count")
+        removed = remove_duplicate_likes(conn)
+        if removed:
+            print(f"Removed {removed} duplicate likes")
+        removed = remove_duplicate_neighbors(conn)
+        if removed:
+            print(f"Removed {removed} duplicate neighbor rows")
+        created = create_indexes(conn, inspect(conn))
+        for name in created:
+            print(f"Created index {name}")
+        for name in drop_replaced_indexes(conn, inspect(conn)):  # After the unique index exists, for MySQL's FK check
+            print(f"Dropped index {name}")
+        backfill_like_counts(conn)  # Recount every run, in case counts drifted while the app ran on an older schema
+
+    print("✅ Database schema is up to date.")
+
+
+if __name__ == "__main__":
+    migrate()
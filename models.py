@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, Index, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from database import Base
@@ -17,6 +17,9 @@ class User(Base):
 
 class Article(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        Index("ix_articles_author_created", "author_id", "created_at"),  # /users/{id}/articles filter + sort
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -24,6 +27,7 @@ class Article(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     author_id = Column(Integer, ForeignKey("users.id"))
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")  # Kept in step with likes by like_article
 
     author = relationship("User", back_populates="articles")
     likes = relationship("Like", back_populates="article")
@@ -31,6 +35,10 @@ class Article(Base):
 
 class Like(Base):
     __tablename__ = "likes"
+    __table_args__ = (
+        Index("uq_likes_user_article", "user_id", "article_id", unique=True),  # One like per user per article; also serves by-user lookups
+        Index("ix_likes_article_id", "article_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -39,3 +47,16 @@ class Like(Base):
 
     user = relationship("User", back_populates="likes")
     article = relationship("Article", back_populates="likes")
+
+
+class ArticleNeighbor(Base):
+    __tablename__ = "article_neighbors"
+    __table_args__ = (
+        Index("uq_article_neighbors_article_rank", "article_id", "rank", unique=True),  # lookup_neighbors filter + sort; upsert key
+    )
+
+    id = Column(Integer, primary_key=True)
+    article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
+    rank = Column(Integer, nullable=False)
+    row_id = Column(Integer, nullable=False)  # Row of the recommended article in final_nlp_data.pkl
+    similarity = Column(Float, nullable=False)
@@ -0,0 +1,110 @@
+import argparse
+import time
+
+from database import SessionLocal
+from models import Article, ArticleNeighbor
+from recommend_module import tfidf, index, store
+from recommend_index import valid_hits
+
+NEIGHBOR_TOP_K = 5  # Recommendations shown on the read page
+
+
+def compute_neighbors(titles, top_k=NEIGHBOR_TOP_K):
+    """Top-k corpus rows for each title, computed in one TF-IDF transform and index search"""
+    query_vecs = tfidf.get().transform(titles)
+    similarities, indices = index.get().search(query_vecs, top_k)
+    return [valid_hits(row_ids, sims) for row_ids, sims in zip(indices, similarities)]
+
+
+def upsert_statement(dialect):
+    """INSERT into article_neighbors that overwrites the row already holding (article_id, rank)"""
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(ArticleNeighbor)
+        return statement.on_duplicate_key_update(row_id=statement.inserted.row_id, similarity=statement.inserted.similarity)
+    if dialect in ("sqlite", "postgresql"):
+        from importlib import import_module
+        statement = import_module(f"sqlalchemy.dialects.{dialect}").insert(ArticleNeighbor)
+        return statement.on_conflict_do_update(
+            index_elements=["article_id", "rank"],
+            set_={"row_id": statement.excluded.row_id, "similarity": statement.excluded.similarity},
+        )
+    raise NotImplementedError(f"No neighbor upsert for {dialect}")
+
+
+def store_neighbors(db, article_id, neighbors):
+    """Upsert by (article_id, rank), so concurrent first views of an article cannot leave duplicate rows"""
+    rows = [
+        {"article_id": article_id, "rank": rank, "row_id": row_id, "similarity": similarity}
+        for rank, (row_id, similarity) in enumerate(neighbors)
+    ]
+    if rows:
+        db.execute(upsert_statement(db.get_bind().dialect.name), rows)
+    db.query(ArticleNeighbor).filter(  # Ranks past the new list, if it got shorter
+        ArticleNeighbor.article_id == article_id, ArticleNeighbor.rank >= len(rows)
+    ).delete(synchronize_session=False)
+
+
+def lookup_neighbors(db, article_id, full_text=False):
+    """Stored recommendations for an article, or None if it has not been indexed yet"""
+    rows = (
+        db.query(ArticleNeighbor.row_id, ArticleNeighbor.similarity)
+        .filter(ArticleNeighbor.article_id == article_id)
+        .order_by(ArticleNeighbor.rank)
+        .all()
+    )
+    if not rows:
+        return None
+
+    results = store.get().records([row_id for row_id, _ in rows], full_text=full_text)
+    for result, (_, similarity) in zip(results, rows):
+        result["similarity"] = similarity
+    return results
+
+
+def refresh_article_neighbors(article_id):
+    """Compute and store neighbors for a single article (run as a background task on publish)"""
+    db = SessionLocal()
+    try:
+        article = db.query(Article).filter(Article.id == article_id).first()
+        if article is None:
+            return
+        store_neighbors(db, article.id, compute_neighbors([article.title])[0])
+        db.commit()
+    finally:
+        db.close()
+
+
+def rebuild_neighbor_table(full=False, batch_size=256):
+    """Fill the neighbor table for every article that has no entry yet (or every article if full)"""
+    db = SessionLocal()
+    try:
+        query = db.query(Article.id, Article.title)
+        if not full:
+            indexed = db.query(ArticleNeighbor.article_id).distinct()
+            query = query.filter(~Article.id.in_(indexed))
+
+        last_id = 0
+        total = 0
+        while True:
+            batch = query.filter(Article.id > last_id).order_by(Article.id).limit(batch_size).all()
+            if not batch:
+                break
+            for (article_id, _), neighbors in zip(batch, compute_neighbors([title for _, title in batch])):
+                store_neighbors(db, article_id, neighbors)
+            db.commit()
+            last_id = batch[-1].id
+            total += len(batch)
+        return total
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the per-article recommendation table")
+    parser.add_argument("--full", action="store_true", help="Recompute every article instead of only missing ones")
+    args = parser.parse_args()
+
+    start = time.time()
+    count = rebuild_neighbor_table(full=args.full)
+    print(f"Stored neighbors for {count} articles in {time.time() - start:.1f}s")
@@ -1,20 +1,63 @@
-import pandas as pd
-import numpy as np
-import tensorflow as tf
+import os
+import time
+import queue
 import pickle
-from tensorflow.keras.preprocessing.sequence import pad_sequences
+import asyncio
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from dotenv import load_dotenv
 import warnings
 warnings.filterwarnings("ignore")
 
-model = tf.keras.models.load_model('models/nextword_model.h5')
-tokenizer = pickle.load(open('models/tokenizer.pkl', 'rb'))
+from cache_module import cache_from_env, cache_key
+from loader_module import lazy
+from ngram_module import ngram_model, NGramModel
+
+load_dotenv()
+
+NEXTWORD_BATCH_WINDOW_MS = float(os.getenv("NEXTWORD_BATCH_WINDOW_MS", "2"))  # Wait for company before the first step
+NEXTWORD_MAX_BATCH = int(os.getenv("NEXTWORD_MAX_BATCH", "64"))  # Generations advanced by one forward pass
+NEXTWORD_MAX_WORDS = int(os.getenv("NEXTWORD_MAX_WORDS", "20"))
+NEXTWORD_ENGINE = os.getenv("NEXTWORD_ENGINE", "auto")  # auto | ngram | neural
+NEXTWORD_LATENCY_BUDGET_MS = float(os.getenv("NEXTWORD_LATENCY_BUDGET_MS", "200"))  # auto: above this, answer with the n-gram model
+
+MODEL_PATH = 'models/nextword_model.h5'
+TOKENIZER_PATH = 'models/tokenizer.pkl'
 max_seq_len = 30
 
+
+def load_model():
+    import tensorflow as tf  # Imported here so the API can start without paying for TensorFlow up front
+    return tf.keras.models.load_model(MODEL_PATH)
+
+
+def load_tokenizer():
+    with open(TOKENIZER_PATH, 'rb') as f:
+        return pickle.load(f)
+
+
+# TensorFlow and the model files are optional, so these load on first use only and never gate readiness
+nextword_model = lazy("nextword_model", load_model, required=False)
+nextword_tokenizer = lazy("nextword_tokenizer", load_tokenizer, required=False)
+
+
+def input_id_limit(model, tokenizer):
+    """Ids at or above this can be predicted but never fed back: texts_to_sequences drops them (num_words) and
+    the embedding has no row for them"""
+    limits = [getattr(layer, "input_dim", None) for layer in model.layers[:1]] + [getattr(tokenizer, "num_words", None)]
+    return min(limit for limit in limits if limit) if any(limits) else None
+
+
 def greedy_sample(preds):
     """Select the word with the highest probability."""
     return np.argmax(preds)
 
+
 def generate_next_words(seed_text, model, tokenizer, max_seq_len, num_words=10):
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
     for _ in range(num_words):
         token_list = tokenizer.texts_to_sequences([seed_text])[0]
         token_list = pad_sequences([token_list], maxlen=max_seq_len - 1, padding='pre')
@@ -26,9 +69,246 @@ def generate_next_words(seed_text, model, tokenizer, max_seq_len, num_words=10):
         seed_text += " " + next_word
     return seed_text
 
-# Example usage
-# print(generate_next_words("Artificial intelligence is", model, tokenizer, max_seq_len))
 
+class _Generation:
+    """One request in flight: its token window, the words produced so far and who is waiting"""
+
+    __slots__ = ("key", "window", "remaining", "words", "future", "submitted")
+
+    def __init__(self, key, window, remaining, future, submitted):
+        self.key = key
+        self.window = window
+        self.remaining = remaining
+        self.words = []
+        self.future = future
+        self.submitted = submitted
+
+
+class NextWordService:
+    """Greedy next-word generation with continuous batching across concurrent requests.
+
+    The seed is tokenized once; after that each predicted id is appended to the
+    request's own window, so nothing is re-tokenized. A background worker keeps a set of
+    active generations and advances all of them with a single forward pass per step;
+    requests arriving mid-way join at the next step. The forward pass is a plain
+    ``model(x, training=False)`` call rather than ``model.predict``, which sets up a
+    data pipeline on every call.
+    """
+
+    def __init__(self, model, tokenizer, max_seq_len=max_seq_len, batch_window_ms=NEXTWORD_BATCH_WINDOW_MS,
+                 max_batch_size=NEXTWORD_MAX_BATCH):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.window_size = max_seq_len - 1
+        self.id_limit = input_id_limit(model, tokenizer)
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache = cache_from_env("nextword", 4096, 3600)
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self.requests = 0
+        self.steps = 0
+        self.stepped_rows = 0
+        self.model_seconds = 0.0
+        self._latencies = deque(maxlen=1000)
+        self._step_seconds = deque(maxlen=100)  # Recent forward passes, for the router's latency estimate
+
+    def _forward(self, x):
+        return np.asarray(self.model(x, training=False))
+
+    def tokenize(self, seed_text):
+        return self.tokenizer.texts_to_sequences([seed_text])[0][-self.window_size:]
 
+    def _submit(self, seed_text, num_words):
+        start = time.perf_counter()
+        self.requests += 1
+        future = Future()
+        window = self.tokenize(seed_text)
+        key = cache_key(" ".join(map(str, window)), num_words)  # Seeds with the same token window share results
 
+        words = self.cache.get(key)
+        if words is not None or num_words <= 0:
+            self._latencies.append(time.perf_counter() - start)
+            future.set_result(words or [])
+            return future
 
+        self._ensure_worker()
+        self._queue.put(_Generation(key, window, num_words, future, start))
+        return future
+
+    def generate(self, seed_text, num_words=10):
+        """Same output as generate_next_words: the seed followed by the predicted words"""
+        words = self._submit(seed_text, num_words).result()
+        return " ".join([seed_text] + words)
+
+    async def agenerate(self, seed_text, num_words=10):
+        words = await asyncio.wrap_future(self._submit(seed_text, num_words))
+        return " ".join([seed_text] + words)
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="nextword-batcher", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        active = []
+        while True:
+            if not active:
+                active.append(self._queue.get())  # Idle: block until there is work
+                deadline = time.perf_counter() + self.batch_window
+                while len(active) < self.max_batch_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        active.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+            while len(active) < self.max_batch_size:  # Busy: pick up whatever arrived during the last step
+                try:
+                    active.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            active = self._step(active)
+
+    def _step(self, active):
+        x = np.zeros((len(active), self.window_size), dtype=np.int32)  # Pre-padded, like pad_sequences
+        for row, generation in enumerate(active):
+            if generation.window:
+                x[row, -len(generation.window):] = generation.window
+
+        start = time.perf_counter()
+        try:
+            next_ids = self._forward(x).argmax(axis=1)
+        except Exception as e:
+            for generation in active:
+                generation.future.set_exception(e)
+            return []
+        finished = time.perf_counter()
+        self.steps += 1
+        self.stepped_rows += len(active)
+        self.model_seconds += finished - start
+        self._step_seconds.append(finished - start)
+
+        still_active = []
+        for generation, next_id in zip(active, next_ids.tolist()):
+            word = self.tokenizer.index_word.get(next_id, '')
+            if word:
+                generation.words.append(word)
+                if self.id_limit is None or next_id < self.id_limit:  # Otherwise re-tokenizing would have dropped it too
+                    generation.window = (generation.window + [next_id])[-self.window_size:]
+                generation.remaining -= 1
+            else:
+                generation.remaining = 0  # Greedy decoding would predict the same padding id on every later step
+            if generation.remaining > 0:
+                still_active.append(generation)
+            else:
+                self.cache.set(generation.key, generation.words)
+                self._latencies.append(finished - generation.submitted)
+                generation.future.set_result(generation.words)
+        return still_active
+
+    def estimate_ms(self, num_words):
+        """Expected latency of a new request: the batching window plus one recent median step per word"""
+        steps = sorted(self._step_seconds)
+        step_ms = 1000 * steps[len(steps) // 2] if steps else 0.0
+        return 1000 * self.batch_window + num_words * step_ms
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3) if latencies else None
+
+        return {
+            "requests": self.requests,
+            "steps": self.steps,
+            "avg_batch_size": round(self.stepped_rows / self.steps, 2) if self.steps else 0.0,
+            "avg_step_ms": round(1000 * self.model_seconds / self.steps, 3) if self.steps else None,
+            "queued": self._queue.qsize(),
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "cache": self.cache.stats(),
+        }
+
+
+nextword_service = lazy("nextword_service", lambda: NextWordService(nextword_model.get(), nextword_tokenizer.get()),
+                        required=False)
+
+
+class NextWordRouter:
+    """Picks the engine for a greedy request: the LSTM service when it can answer within the latency budget,
+    otherwise the n-gram model.
+
+    Under NEXTWORD_ENGINE=auto the n-gram model answers while TensorFlow and the LSTM are
+    still loading (the load is started in the background on first use), when the service's
+    recent step times put the request over budget, and when the LSTM raises.
+    """
+
+    def __init__(self, engine=NEXTWORD_ENGINE, budget_ms=NEXTWORD_LATENCY_BUDGET_MS):
+        self.engine = engine
+        self.budget_ms = budget_ms
+        self.routed = {"neural": 0, "ngram": 0}
+        self.fallbacks = 0
+        self._loading = None
+
+    def _load_neural_in_background(self):
+        if self._loading is None or not self._loading.is_alive():  # A failed load is retried on a later request
+            self._loading = threading.Thread(target=self._load_neural, name="nextword-loader", daemon=True)
+            self._loading.start()
+
+    def _load_neural(self):
+        try:
+            nextword_service.get()
+        except Exception as e:
+            print(f"Loading nextword_service failed: {e}")
+
+    def choose(self, num_words, budget_ms=None):
+        if self.engine in ("ngram", "neural"):
+            return self.engine
+        if not ngram_model.loaded and not NGramModel.built():  # Nothing to fall back to until `python ngram_module.py` runs
+            return "neural"
+        if not nextword_service.loaded:
+            self._load_neural_in_background()
+            return "ngram"
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        return "neural" if nextword_service.get().estimate_ms(num_words) <= budget_ms else "ngram"
+
+    async def agenerate(self, seed_text, num_words=10, budget_ms=None):
+        """(text, engine) with the same text format as generate_next_words"""
+        engine = self.choose(num_words, budget_ms)
+        if engine == "neural":
+            try:
+                service = await nextword_service.aget()
+                text = await service.agenerate(seed_text, num_words)
+                self.routed["neural"] += 1
+                return text, "neural"
+            except Exception as e:
+                if self.engine == "neural" or not (ngram_model.loaded or NGramModel.built()):
+                    raise
+                self.fallbacks += 1
+                print(f"Neural next-word prediction failed, answering with the n-gram model: {e}")
+        model = await ngram_model.aget()
+        self.routed["ngram"] += 1
+        return model.generate_next_words(seed_text, num_words), "ngram"
+
+    def stats(self):
+        return {
+            "engine": self.engine,
+            "latency_budget_ms": self.budget_ms,
+            "routed": dict(self.routed),
+            "fallbacks": self.fallbacks,
+            "neural_loaded": nextword_service.loaded,
+            "ngram_loaded": ngram_model.loaded,
+        }
+
+
+nextword_router = NextWordRouter()
+
+# Example usage
+# print(nextword_service.get().generate("Artificial intelligence is"))
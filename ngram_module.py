@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+from collections import Counter
+from dotenv import load_dotenv
+
+from loader_module import lazy
+
+load_dotenv()
+
+NGRAM_PATH = os.getenv("NGRAM_PATH", "models/ngram")
+NGRAM_BACKOFF = 0.4  # Stupid-backoff penalty per order dropped (Brants et al. 2007)
+NGRAM_TOP_K = 8  # Continuations precomputed per trie node
+
+# Same splitting as the Keras Tokenizer defaults, so n-gram and LSTM see the same words
+KERAS_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+FILTER_TABLE = str.maketrans(KERAS_FILTERS, " " * len(KERAS_FILTERS))
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def words_of(text):
+    return text.lower().translate(FILTER_TABLE).split()
+
+
+class NGramModel:
+    """Stupid-backoff n-gram model stored as an array-backed trie.
+
+    Level k holds every k-gram in lexicographic order as three arrays: the last word
+    id, its count, and where its children start in level k + 1 (children of a node are
+    a contiguous, id-sorted slice, found with a binary search). Each node also keeps
+    its NGRAM_TOP_K most frequent children, which are the candidates for the next word.
+    Every array is a plain .npy file opened with mmap, so workers share one copy.
+    """
+
+    def __init__(self, path=NGRAM_PATH):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.order = meta["order"]
+        self.total = meta["total_tokens"]
+        with open(os.path.join(path, "vocab.txt"), encoding="utf-8") as f:
+            self.index_word = dict(enumerate(f.read().split("\n"), start=1))
+        self.word_index = {word: i for i, word in self.index_word.items()}
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.words = [load(f"words{k}") for k in range(1, self.order + 1)]
+        self.counts = [load(f"counts{k}") for k in range(1, self.order + 1)]
+        self.child_start = [load(f"child_start{k}") for k in range(1, self.order)]
+        self.top = [load(f"top{k}") for k in range(0, self.order)]  # top0: most frequent unigrams
+
+    def _child(self, level, node, word):
+        """Index in level + 1 of node's child with this word id, or -1"""
+        start, end = int(self.child_start[level][node]), int(self.child_start[level][node + 1])
+        i = start + int(np.searchsorted(self.words[level + 1][start:end], word))
+        return i if i < end and self.words[level + 1][i] == word else -1
+
+    def _node(self, ids):
+        """(level, index) of the trie node for a sequence of word ids, or None"""
+        if not ids or ids[0] <= 0:
+            return None
+        node = ids[0] - 1  # Level 1 is dense: every vocabulary id is a unigram
+        for level, word in enumerate(ids[1:]):
+            node = self._child(level, node, word)
+            if node < 0:
+                return None
+        return len(ids) - 1, node
+
+    def _contexts(self, ids):
+        """Trie nodes of the context suffixes, longest first, as (length, node or None); unknown words cut it short"""
+        context = list(ids[-(self.order - 1):]) if self.order > 1 else []
+        if 0 in context:
+            context = context[len(context) - context[::-1].index(0):]
+        contexts = []
+        for start in range(len(context)):
+            found = self._node(context[start:])
+            contexts.append((len(context) - start, None if found is None else found[1]))
+        return contexts
+
+    def scores(self, contexts, words):
+        """Stupid-backoff scores S(word | context) for an id array: the longest suffix that was followed by the
+        word, times 0.4 per word dropped"""
+        scores = np.zeros(len(words))
+        done = np.zeros(len(words), dtype=bool)
+        penalty = 1.0
+        for length, node in contexts:
+            if node is not None:
+                start, end = int(self.child_start[length - 1][node]), int(self.child_start[length - 1][node + 1])
+                children = self.words[length][start:end]
+                i = np.minimum(np.searchsorted(children, words), max(end - start - 1, 0))
+                hit = ~done & (children[i] == words) if end > start else np.zeros(len(words), dtype=bool)
+                scores[hit] = penalty * self.counts[length][start + i[hit]] / int(self.counts[length - 1][node])
+                done |= hit
+            penalty *= NGRAM_BACKOFF
+        scores[~done] = penalty * self.counts[0][words[~done] - 1] / self.total
+        return scores
+
+    def tokenize(self, text):
+        return [self.word_index.get(word, 0) for word in words_of(text)]
+
+    def predict(self, ids):
+        """Best next word id after ids; candidates are the top continuations of every context suffix"""
+        contexts = self._contexts(ids)
+        candidates = set(self.top[0].tolist())
+        for length, node in contexts:
+            if node is not None:
+                candidates.update(self.top[length][node].tolist())
+        candidates.discard(0)
+        if not candidates:
+            return 0
+        words = np.array(sorted(candidates), dtype=np.int64)
+        return int(words[np.argmax(self.scores(contexts, words))])  # Ties go to the more frequent (lower) id
+
+    def generate_next_words(self, seed_text, num_words=10):
+        ids = self.tokenize(seed_text)
+        for _ in range(num_words):
+            next_id = self.predict(ids)
+            if next_id == 0:
+                break
+            seed_text += " " + self.index_word[next_id]
+            ids.append(next_id)
+        return seed_text
+
+    @classmethod
+    def build(cls, data_path="final_nlp_data.pkl", path=NGRAM_PATH, order=3, max_vocab=50000, min_count=2,
+              chunk_tokens=20_000_000):
+        """Count n-grams over the corpus sentences and write the trie arrays into a temp dir, then swap it in"""
+        import pandas as pd
+
+        start = time.time()
+        df = pd.read_pickle(data_path)
+        frequencies = Counter()
+        sentences = []
+        for text in df["clean_text"].dropna():
+            for sentence in SENTENCE_SPLIT.split(text):
+                words = words_of(sentence)
+                if len(words) > 3:  # Same filter as the LSTM training sentences
+                    sentences.append(words)
+                    frequencies.update(words)
+
+        vocab = [word for word, _ in frequencies.most_common(max_vocab)]
+        word_index = {word: i for i, word in enumerate(vocab, start=1)}
+        bits = int(len(vocab) + 1).bit_length()
+        if bits * order > 63:
+            raise ValueError(f"order {order} with {len(vocab)} words does not fit 64-bit n-gram keys")
+
+        # One flat id array with a 0 between sentences; n-grams spanning a 0 are dropped
+        tokens = np.zeros(sum(len(s) + 1 for s in sentences), dtype=np.int64)
+        position = 0
+        for words in sentences:
+            tokens[position:position + len(words)] = [word_index.get(word, 0) for word in words]
+            position += len(words) + 1
+        total_tokens = int(np.count_nonzero(tokens))
+
+        keys, counts = [], []
+        for k in range(1, order + 1):
+            level_keys, level_counts = [], []
+            for chunk_start in range(0, len(tokens) - k + 1, chunk_tokens):
+                chunk = tokens[chunk_start:min(len(tokens), chunk_start + chunk_tokens + k - 1)]
+                grams = np.lib.stride_tricks.sliding_window_view(chunk, k)
+                grams = grams[(grams > 0).all(axis=1)]
+                gram_keys = np.zeros(len(grams), dtype=np.int64)
+                for column in range(k):
+                    gram_keys = (gram_keys << bits) | grams[:, column]
+                unique, unique_counts = np.unique(gram_keys, return_counts=True)
+                level_keys.append(unique)
+                level_counts.append(unique_counts)
+            merged = np.concatenate(level_keys)
+            unique, inverse = np.unique(merged, return_inverse=True)
+            merged_counts = np.bincount(inverse, weights=np.concatenate(level_counts)).astype(np.int64)
+            if k == 1:
+                dense = np.zeros(len(vocab) + 1, dtype=np.int64)  # Keep level 1 dense so id - 1 indexes it
+                dense[unique] = merged_counts
+                unique, merged_counts = np.arange(1, len(vocab) + 1, dtype=np.int64), dense[1:]
+            elif min_count > 1:
+                keep = merged_counts >= min_count  # A prefix always counts at least as much, so parents survive
+                unique, merged_counts = unique[keep], merged_counts[keep]
+            keys.append(unique)
+            counts.append(merged_counts)
+            print(f"{k}-grams: {len(unique)}")
+
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        mask = (1 << bits) - 1
+        top_unigrams = np.argsort(-counts[0], kind="stable")[:NGRAM_TOP_K] + 1
+        np.save(os.path.join(tmp_path, "top0.npy"), top_unigrams.astype(np.int32))
+        for k in range(1, order + 1):
+            level = k - 1
+            np.save(os.path.join(tmp_path, f"words{k}.npy"), (keys[level] & mask).astype(np.int32))
+            np.save(os.path.join(tmp_path, f"counts{k}.npy"), counts[level].astype(np.uint32))
+            if k == order:
+                continue
+            parents = keys[level + 1] >> bits  # Sorted, because children are sorted by their full key
+            child_start = np.searchsorted(parents, keys[level], side="left")
+            np.save(os.path.join(tmp_path, f"child_start{k}.npy"),
+                    np.append(child_start, len(parents)).astype(np.int64))
+
+            # Most frequent children per node: sort children by (parent, -count) and keep the first NGRAM_TOP_K
+            parent_index = np.searchsorted(keys[level], parents)
+            by_count = np.lexsort((-counts[level + 1], parent_index))
+            group_start = np.searchsorted(parent_index[by_count], parent_index[by_count], side="left")
+            rank = np.arange(len(by_count)) - group_start
+            top = np.zeros((len(keys[level]), NGRAM_TOP_K), dtype=np.int32)
+            keep = rank < NGRAM_TOP_K
+            top[parent_index[by_count][keep], rank[keep]] = (keys[level + 1][by_count][keep] & mask).astype(np.int32)
+            np.save(os.path.join(tmp_path, f"top{k}.npy"), top)
+
+        with open(os.path.join(tmp_path, "vocab.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(vocab))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({"order": order, "total_tokens": total_tokens, "vocab_size": len(vocab), "min_count": min_count}, f)
+
+        old_path = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        print(f"N-gram model (order {order}, {len(vocab)} words) written to {path} in {time.time() - start:.1f}s")
+
+    @staticmethod
+    def built(path=NGRAM_PATH):
+        return os.path.exists(os.path.join(path, "meta.json"))
+
+    @classmethod
+    def open(cls, path=NGRAM_PATH):
+        """Open a built model; building is a deploy step, so several workers never race to build it on first use"""
+        if not cls.built(path):
+            raise FileNotFoundError(f"N-gram model not found at {path}. Run `python ngram_module.py` first.")
+        return cls(path)
+
+
+def generate_next_words(seed_text, model, tokenizer=None, max_seq_len=None, num_words=10):
+    """Drop-in for nextword_module.generate_next_words; tokenizer and max_seq_len are not needed here"""
+    return model.generate_next_words(seed_text, num_words)
+
+
+ngram_model = lazy("ngram_model", NGramModel.open, required=False)  # Built with `python ngram_module.py`
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the n-gram autocomplete model from final_nlp_data.pkl")
+    parser.add_argument("--order", type=int, default=3)
+    parser.add_argument("--max-vocab", type=int, default=50000)
+    parser.add_argument("--min-count", type=int, default=2, help="Drop n-grams (n >= 2) seen fewer times")
+    args = parser.parse_args()
+    NGramModel.build(order=args.order, max_vocab=args.max_vocab, min_count=args.min_count)
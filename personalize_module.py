@@ -0,0 +1,132 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy.sparse import csr_matrix
+from dotenv import load_dotenv
+
+from models import Article, Like
+from recommend_module import tfidf, index, store
+from recommend_index import valid_hits
+
+load_dotenv()
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))  # Users whose profile vectors stay in memory
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))  # Seconds before a profile is rebuilt, picking up likes made in other workers
+PROFILE_BUILD_ATTEMPTS = 3
+
+
+class ProfileStore:
+    """Per-user TF-IDF profile vectors for "for you" feeds.
+
+    A profile is the running sum of the user's liked articles' TF-IDF vectors. It is
+    built from the likes table on a cache miss, and after that each like or unlike in
+    this worker adds or subtracts a single article vector instead of replaying the
+    history. A like that lands while the profile is being built bumps the user's build
+    version, and the build is redone rather than cached without it. Profiles expire
+    after ``ttl_seconds`` so likes handled by other workers show up too.
+    """
+
+    def __init__(self, max_users=PROFILE_CACHE_SIZE, ttl_seconds=PROFILE_CACHE_TTL):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._profiles = OrderedDict()  # user_id -> {"sum": 1 x vocab sparse row, "liked": set of article ids, "expires_at"}
+        self._builds = {}  # user_id -> [builds in progress, likes applied since they started]
+        self._lock = threading.Lock()
+
+    def article_vector(self, article):
+        return tfidf.get().transform([f"{article.title} {article.content}"])
+
+    def _build(self, db, user_id):
+        articles = (
+            db.query(Article)
+            .join(Like, Like.article_id == Article.id)
+            .filter(Like.user_id == user_id)
+            .all()
+        )
+        profile = {"sum": None, "liked": set(), "expires_at": time.time() + self.ttl_seconds}
+        if articles:
+            vectors = tfidf.get().transform([f"{a.title} {a.content}" for a in articles])
+            profile["sum"] = csr_matrix(np.ones((1, vectors.shape[0]))) @ vectors  # Sparse sum; one transform for the whole history
+            profile["liked"] = {a.id for a in articles}
+        return profile
+
+    def _remember(self, user_id, profile):
+        self._profiles[user_id] = profile
+        self._profiles.move_to_end(user_id)
+        while len(self._profiles) > self.max_users:
+            self._profiles.popitem(last=False)
+
+    def get(self, db, user_id):
+        for _ in range(PROFILE_BUILD_ATTEMPTS):
+            with self._lock:
+                profile = self._profiles.get(user_id)
+                if profile is not None and profile["expires_at"] > time.time():
+                    self._profiles.move_to_end(user_id)
+                    return profile
+                build = self._builds.setdefault(user_id, [0, 0])
+                build[0] += 1
+                version = build[1]
+            try:
+                profile = self._build(db, user_id)
+            finally:
+                with self._lock:
+                    build[0] -= 1
+                    changed = build[1] != version
+                    if build[0] == 0:
+                        del self._builds[user_id]
+            if changed:  # A like was committed mid-build and may be missing from what we read
+                continue
+            with self._lock:
+                cached = self._profiles.get(user_id)
+                if cached is not None and cached["expires_at"] > time.time():  # Built concurrently; keep the one likes were applied to
+                    return cached
+                self._remember(user_id, profile)
+                return profile
+        return profile  # Still racing with likes: serve the latest build without caching it
+
+    def apply_like(self, user_id, article, liked):
+        """Update a cached profile in place; uncached profiles are built from the table on next use"""
+        with self._lock:
+            if user_id in self._builds:
+                self._builds[user_id][1] += 1
+            profile = self._profiles.get(user_id)
+            if profile is None or (article.id in profile["liked"]) == liked:
+                return  # Not cached, or the cached profile already reflects this like
+        vector = self.article_vector(article)
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is None or (article.id in profile["liked"]) == liked:
+                return
+            if liked:
+                profile["sum"] = vector if profile["sum"] is None else profile["sum"] + vector
+                profile["liked"].add(article.id)
+            else:
+                profile["sum"] = profile["sum"] - vector
+                profile["sum"].eliminate_zeros()
+                profile["liked"].discard(article.id)
+            self._profiles.move_to_end(user_id)
+
+    def recommend(self, db, user_id, top_k=10, full_text=False):
+        """Corpus articles nearest to the user's profile, or None if they have not liked anything"""
+        profile = self.get(db, user_id)
+        if not profile["liked"] or profile["sum"] is None:
+            return None
+
+        norm = np.sqrt(profile["sum"].multiply(profile["sum"]).sum())
+        if norm < 1e-12:
+            return None
+        similarities, indices = index.get().search(profile["sum"] / norm, top_k)  # Unit vector, so scores are cosines
+
+        hits = valid_hits(indices[0], similarities[0])
+        results = store.get().records([row_id for row_id, _ in hits], full_text=full_text)
+        for result, (_, similarity) in zip(results, hits):
+            result["similarity"] = similarity
+        return results
+
+    def stats(self):
+        return {"cached_profiles": len(self._profiles), "max_users": self.max_users, "ttl_seconds": self.ttl_seconds}
+
+
+profile_store = ProfileStore()
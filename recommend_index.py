@@ -0,0 +1,217 @@
+import os
+import time
+import argparse
+import joblib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Which backend recommend_module searches with: "brute" (exact), "ivf" or "hnsw" (approximate)
+RECOMMEND_INDEX = os.getenv("RECOMMEND_INDEX", "brute")
+ANN_NPROBE = int(os.getenv("RECOMMEND_INDEX_NPROBE", "16"))  # IVF cells visited per query
+ANN_EF_SEARCH = int(os.getenv("RECOMMEND_INDEX_EF_SEARCH", "64"))  # HNSW search breadth
+ANN_RERANK_FACTOR = int(os.getenv("RECOMMEND_INDEX_RERANK", "4"))  # Candidates fetched per requested result
+SCORER_THREADS = int(os.getenv("RECOMMEND_SCORER_THREADS", str(os.cpu_count() or 1)))  # Row shards scored in parallel
+SCORER_FLOAT32 = os.getenv("RECOMMEND_SCORER_FLOAT32", "0") == "1"  # Halve the matrix footprint at ~1e-7 score error
+
+def ann_index_path(kind):
+    return f"models/recommend_{kind}.faiss"
+
+
+def svd_path(kind):
+    """Each index kind keeps its own projection, so rebuilding one with other --components leaves the rest intact"""
+    return f"models/recommend_{kind}_svd.pkl"
+
+
+def valid_hits(row_ids, similarities):
+    """(row_id, similarity) pairs of one result row, without the -1 padding ANN indexes use for missing hits"""
+    return [(row_id, similarity) for row_id, similarity in zip(row_ids.tolist(), similarities.tolist()) if row_id >= 0]
+
+
+def top_k_rows(scores, k):
+    """Column indices of the k highest scores in each row, best first (ties broken by lower index)"""
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class SparseTopKScorer:
+    """Exact cosine search as a sparse dot product over the L2-normalized TF-IDF rows.
+
+    The matrix is split into row shards scored on a thread pool (scipy's sparse
+    kernels release the GIL); each shard keeps its own top-k with argpartition and
+    the shard winners are merged.
+    """
+
+    name = "brute"
+
+    def __init__(self, tfidf_matrix, n_threads=SCORER_THREADS, float32=SCORER_FLOAT32, min_shard_rows=20000):
+        matrix = tfidf_matrix.tocsr()
+        if float32:
+            matrix = matrix.astype(np.float32)
+        self.dtype = matrix.dtype
+        self.n_rows = matrix.shape[0]
+
+        n_shards = max(1, min(n_threads, self.n_rows // min_shard_rows))
+        bounds = np.linspace(0, self.n_rows, n_shards + 1, dtype=np.int64)
+        self.shards = [(int(start), matrix[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+        self._pool = ThreadPoolExecutor(max_workers=n_shards, thread_name_prefix="tfidf-scorer") if n_shards > 1 else None
+
+    def _score_shard(self, shard, query_dense, k):
+        start, rows = shard
+        scores = np.asarray(rows @ query_dense).T  # (n_queries, shard_rows)
+        local = top_k_rows(scores, k)
+        return local + start, np.take_along_axis(scores, local, axis=1)
+
+    def search(self, query_vecs, k):
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")  # A negative k would slice off all but the last -k rows
+        k = min(k, self.n_rows)
+        query_dense = np.ascontiguousarray(query_vecs.T.toarray(), dtype=self.dtype)  # (vocab, n_queries)
+
+        if self._pool is None:
+            results = [self._score_shard(self.shards[0], query_dense, k)]
+        else:
+            results = list(self._pool.map(lambda shard: self._score_shard(shard, query_dense, k), self.shards))
+
+        indices = np.hstack([shard_indices for shard_indices, _ in results])
+        scores = np.hstack([shard_scores for _, shard_scores in results])
+        best = top_k_rows(scores, k) if len(results) > 1 else np.broadcast_to(np.arange(k), scores.shape)
+        return (np.take_along_axis(scores, best, axis=1).astype(np.float64),
+                np.take_along_axis(indices, best, axis=1))
+
+
+class NearestNeighborsIndex:
+    """The original sklearn brute-force cosine model, kept as a reference for equality checks."""
+
+    name = "nn"
+
+    def __init__(self, nn):
+        self.nn = nn
+
+    def search(self, query_vecs, k):
+        distances, indices = self.nn.kneighbors(query_vecs, n_neighbors=k)
+        return 1 - distances, indices  # Cosine similarity = 1 - distance
+
+
+class FaissANNIndex:
+    """Approximate search over SVD-reduced TF-IDF vectors with a FAISS IVF or HNSW index.
+
+    Candidates are re-scored against the exact TF-IDF rows, so the similarities
+    returned are the same cosine values the brute-force backend reports. When fewer
+    than k candidates come back, the rest of the row is padded with index -1, as
+    FAISS itself does; callers drop those with ``valid_hits``.
+    """
+
+    def __init__(self, kind, svd, index, tfidf_matrix):
+        self.name = kind
+        self.svd = svd
+        self.index = index
+        self.tfidf_matrix = tfidf_matrix
+        self.set_search_params()
+
+    def set_search_params(self, nprobe=ANN_NPROBE, ef_search=ANN_EF_SEARCH):
+        import faiss
+        if self.name == "ivf":
+            faiss.extract_index_ivf(self.index).nprobe = nprobe
+        elif self.name == "hnsw":
+            self.index.hnsw.efSearch = ef_search
+
+    def _reduce(self, query_vecs):
+        import faiss
+        reduced = np.ascontiguousarray(self.svd.transform(query_vecs), dtype=np.float32)
+        faiss.normalize_L2(reduced)
+        return reduced
+
+    def search(self, query_vecs, k):
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        n_candidates = min(k * ANN_RERANK_FACTOR, self.index.ntotal)
+        _, candidates = self.index.search(self._reduce(query_vecs), n_candidates)
+
+        similarities = np.zeros((query_vecs.shape[0], k), dtype=np.float64)
+        indices = np.full((query_vecs.shape[0], k), -1, dtype=np.int64)
+        for i, row in enumerate(candidates):
+            row = row[row >= 0]  # FAISS pads missing results with -1
+            scores = (self.tfidf_matrix[row] @ query_vecs[i].T).toarray().ravel()
+            order = np.argsort(-scores, kind="stable")[:k]
+            similarities[i, :len(order)] = scores[order]
+            indices[i, :len(order)] = row[order]
+        return similarities, indices
+
+    @classmethod
+    def build(cls, kind, tfidf_matrix, n_components=256, nlist=None, hnsw_m=32, batch_size=50000):
+        import faiss
+        from sklearn.decomposition import TruncatedSVD
+
+        svd = TruncatedSVD(n_components=n_components, random_state=42)
+        svd.fit(tfidf_matrix)
+
+        if kind == "ivf":
+            nlist = nlist or max(1, int(4 * np.sqrt(tfidf_matrix.shape[0])))
+            quantizer = faiss.IndexFlatIP(n_components)
+            index = faiss.IndexIVFFlat(quantizer, n_components, nlist, faiss.METRIC_INNER_PRODUCT)
+            train_rows = np.random.default_rng(42).choice(
+                tfidf_matrix.shape[0], size=min(tfidf_matrix.shape[0], nlist * 64), replace=False
+            )
+            train = np.ascontiguousarray(svd.transform(tfidf_matrix[np.sort(train_rows)]), dtype=np.float32)
+            faiss.normalize_L2(train)
+            index.train(train)
+        elif kind == "hnsw":
+            index = faiss.IndexHNSWFlat(n_components, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+        else:
+            raise ValueError(f"Unknown ANN index kind: {kind}")
+
+        # Reduce and add in batches so the dense copy of the corpus never sits in memory at once
+        for start in range(0, tfidf_matrix.shape[0], batch_size):
+            reduced = np.ascontiguousarray(svd.transform(tfidf_matrix[start:start + batch_size]), dtype=np.float32)
+            faiss.normalize_L2(reduced)
+            index.add(reduced)
+
+        return cls(kind, svd, index, tfidf_matrix)
+
+    def save(self):
+        import faiss
+        joblib.dump(self.svd, svd_path(self.name))
+        faiss.write_index(self.index, ann_index_path(self.name))
+
+    @classmethod
+    def load(cls, kind, tfidf_matrix):
+        import faiss
+        if not os.path.exists(ann_index_path(kind)) or not os.path.exists(svd_path(kind)):
+            raise FileNotFoundError(f"ANN index '{kind}' not found. Run `python recommend_index.py --kind {kind}` first.")
+        return cls(kind, joblib.load(svd_path(kind)), faiss.read_index(ann_index_path(kind)), tfidf_matrix)
+
+
+def load_index(tfidf_matrix, kind=RECOMMEND_INDEX):
+    """Return the recommendation index selected by configuration."""
+    if kind == "brute":
+        return SparseTopKScorer(tfidf_matrix)
+    if kind == "nn":
+        return NearestNeighborsIndex(joblib.load('models/nearest_neighbors.pkl'))
+    return FaissANNIndex.load(kind, tfidf_matrix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an approximate recommendation index over the TF-IDF matrix")
+    parser.add_argument("--kind", choices=["ivf", "hnsw"], default="hnsw")
+    parser.add_argument("--components", type=int, default=256, help="SVD dimensions kept before indexing")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cells (default 4 * sqrt(N))")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW graph degree")
+    args = parser.parse_args()
+
+    tfidf_matrix = joblib.load('models/tfidf_matrix.pkl')
+    start = time.time()
+    ann = FaissANNIndex.build(args.kind, tfidf_matrix, n_components=args.components, nlist=args.nlist, hnsw_m=args.hnsw_m)
+    ann.save()
+    print(f"Built {args.kind} index over {tfidf_matrix.shape[0]} articles in {time.time() - start:.1f}s")
@@ -1,28 +1,57 @@
 import pandas as pd
 import joblib
+from recommend_index import load_index, valid_hits
+from article_store import ArticleStore
+from cache_module import cache_from_env, cache_key, normalize_query
+from loader_module import lazy
 
 
-# Load models
-tfidf = joblib.load('models/tfidf_vectorizer.pkl')
-tfidf_matrix = joblib.load('models/tfidf_matrix.pkl')
-nn = joblib.load('models/nearest_neighbors.pkl')
-df = pd.read_pickle('final_nlp_data.pkl')  # Load corresponding article metadata
+# Models load on first use (or during warm-up); call .get() to obtain them
+tfidf = lazy("tfidf_vectorizer", lambda: joblib.load('models/tfidf_vectorizer.pkl'))
+tfidf_matrix = lazy("tfidf_matrix", lambda: joblib.load('models/tfidf_matrix.pkl'))
+index = lazy("recommend_index", lambda: load_index(tfidf_matrix.get()))  # Brute-force or ANN backend, picked by RECOMMEND_INDEX
+store = lazy("article_store", ArticleStore.open)  # Memory-mapped article titles and text, shared across workers
+recommend_cache = cache_from_env("recommend", max_size=4096, ttl_seconds=3600)
 
-def recommend_articles(query, top_k=5):
-    # Transform query using TF-IDF
-    query_vec = tfidf.transform([query])
-    
-    # Find nearest neighbors
-    distances, indices = nn.kneighbors(query_vec, n_neighbors=top_k)
-    
-    # Fetch and return results
-    results = df.iloc[indices[0]].copy()
-    results["similarity"] = 1 - distances[0]  # Cosine similarity = 1 - distance
-    return results[["clean_title", "similarity", "clean_text"]]
+def _search_records(queries, top_k, full_text):
+    """One TF-IDF transform and one index search for every query, returning a record list per query"""
+    query_vecs = tfidf.get().transform(queries)
+    similarities, indices = index.get().search(query_vecs, top_k)
+    article_store = store.get()
+    results = []
+    for row_ids, sims in zip(indices, similarities):
+        hits = valid_hits(row_ids, sims)
+        records = article_store.records([row_id for row_id, _ in hits], full_text=full_text)
+        for record, (_, similarity) in zip(records, hits):
+            record["similarity"] = similarity
+        results.append(records)
+    return results
 
+def recommend_articles(query, top_k=5, full_text=False):
+    key = cache_key(normalize_query(query), top_k, full_text)
+    records = recommend_cache.get(key)
+    if records is None:
+        # Transform query using TF-IDF, find nearest neighbors and fetch snippets (or full text)
+        records = _search_records([query], top_k, full_text)[0]
+        recommend_cache.set(key, records)
+
+    return pd.DataFrame(records, columns=["row_id", "clean_title", "similarity", "clean_text" if full_text else "snippet"])
+
+def recommend_articles_batch(queries, top_k=5, full_text=False):
+    """Top-k recommendations for many queries at once; cached queries are served without recomputation"""
+    keys = [cache_key(normalize_query(query), top_k, full_text) for query in queries]
+    results = [recommend_cache.get(key) for key in keys]
+
+    missing = [i for i, records in enumerate(results) if records is None]
+    if missing:
+        computed = _search_records([queries[i] for i in missing], top_k, full_text)
+        for i, records in zip(missing, computed):
+            recommend_cache.set(keys[i], records)
+            results[i] = records
+
+    return [[dict(record) for record in records] for records in results]
 
 if __name__ == "__main__":
     query = "Recent advancements in AI for healthcare"
     recommendations = recommend_articles(query, top_k=5)
     print(recommendations)
-
@@ -1,7 +1,12 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 from datetime import datetime
 
+from nextword_module import NEXTWORD_MAX_WORDS
+
+MAX_TOP_K = 100  # Recommendations a client can ask for per query
+MAX_SIMILAR_ARTICLES = 10  # Reference articles stuffed into a generation prompt
+
 
 # User
 class UserCreate(BaseModel):
@@ -45,6 +50,7 @@ class LikeResponse(BaseModel):
     user_id: int
     article_id: int
     created_at: datetime
+    like_count: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -53,18 +59,37 @@ class GeneratedArticle(BaseModel):
     title: str
     content: str
     author_id: int
+    timings: Optional[dict] = None
 
 
 # ML module request schemas
 
 class ArticleRequest(BaseModel):
     title: str
-    num_similar_articles: Optional[int] = 3
+    num_similar_articles: int = Field(3, ge=1, le=MAX_SIMILAR_ARTICLES)  # Also bounds the per-value chain cache
 
 class NextWordRequest(BaseModel):
     seed_text: str
-    num_words: Optional[int] = 10
+    num_words: int = Field(10, ge=1, le=NEXTWORD_MAX_WORDS)
+    strategy: Optional[str] = "greedy"  # greedy | beam | sample
+    beam_width: int = Field(4, ge=1)
+    top_k: int = Field(0, ge=0)  # sample: 0 keeps the whole vocabulary
+    top_p: float = Field(1.0, gt=0, le=1)  # 0 would leave no word to sample
+    temperature: float = Field(1.0, gt=0)
+    latency_budget_ms: Optional[float] = Field(None, ge=0)  # greedy: overrides NEXTWORD_LATENCY_BUDGET_MS for this request
 
 class RecommendRequest(BaseModel):
     query: str
-    top_k: Optional[int] = 5
+    top_k: int = Field(5, ge=1, le=MAX_TOP_K)
+    full_text: Optional[bool] = False  # Snippets by default
+
+class HybridRecommendRequest(BaseModel):
+    query: str
+    top_k: int = Field(5, ge=1, le=MAX_TOP_K)
+    method: Optional[str] = None  # "rrf" or "weighted"; defaults to HYBRID_FUSION
+
+class BatchRecommendRequest(BaseModel):
+    queries: List[str]
+    top_k: int = Field(5, ge=1, le=MAX_TOP_K)
+    full_text: Optional[bool] = False
+    stream: Optional[bool] = None  # NDJSON; defaults to on for large batches
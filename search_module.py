@@ -0,0 +1,266 @@
+import os
+import re
+import math
+import time
+import heapq
+import bisect
+import threading
+from collections import Counter
+import numpy as np
+from dotenv import load_dotenv
+
+from database import SessionLocal
+from models import Article
+from loader_module import lazy
+
+load_dotenv()
+
+SEARCH_TITLE_WEIGHT = float(os.getenv("SEARCH_TITLE_WEIGHT", "3"))  # A title occurrence counts as this many body occurrences
+SEARCH_PREFIX_EXPANSIONS = int(os.getenv("SEARCH_PREFIX_EXPANSIONS", "50"))  # Vocabulary terms a typeahead prefix expands to
+SEARCH_CATCH_UP_INTERVAL = float(os.getenv("SEARCH_CATCH_UP_INTERVAL", "30"))  # Seconds between DB checks for unindexed articles; 0 disables
+SEARCH_CATCH_UP_LOOKBACK = 1000  # Ids below the watermark rechecked each time, for inserts that commit out of id order
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class SearchIndex:
+    """In-memory inverted index over DB article titles and content, ranked with BM25.
+
+    Each article gets a dense slot; postings map term -> {slot: weighted term frequency}
+    and are compiled to numpy arrays on first use, so a query scores every matching
+    article in a few vectorized operations. A sorted copy of the vocabulary lets a
+    trailing partial word be expanded with bisect for typeahead. Adding an article id
+    again replaces it, so the start-up build and publish-time updates can overlap.
+    The index lives in each worker's memory, so a background thread periodically
+    indexes DB articles past the highest id it has read, such as ones published through
+    another worker. It only adds: deleted articles are dropped with ``remove`` and
+    filtered out by the /search route in the meantime.
+    """
+
+    def __init__(self, title_weight=SEARCH_TITLE_WEIGHT):
+        self.title_weight = title_weight
+        self.postings = {}
+        self.vocabulary = []  # Sorted terms, for prefix lookups
+        self.slots = {}  # article_id -> slot
+        self.slot_ids = np.zeros(1024, dtype=np.int64)  # slot -> article_id
+        self.lengths = np.zeros(1024, dtype=np.float32)  # slot -> weighted document length (0 once removed)
+        self.n_slots = 0
+        self.doc_terms = {}  # slot -> terms it was indexed under, so it can be replaced
+        self.total_length = 0.0
+        self._compiled = {}  # term -> (slots, tfs) arrays, dropped whenever the term's postings change
+        self._lock = threading.RLock()
+        self._catch_up_thread = None
+        self.last_catch_up = 0.0
+        self.caught_up_count = 0
+        self.watermark = 0  # Highest article id read from the DB by the build or a catch-up
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def _remove(self, article_id):
+        slot = self.slots.pop(article_id, None)
+        if slot is None:
+            return
+        for term in self.doc_terms.pop(slot):
+            postings = self.postings[term]
+            del postings[slot]
+            self._compiled.pop(term, None)
+            if not postings:
+                del self.postings[term]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+        self.total_length -= float(self.lengths[slot])
+        self.lengths[slot] = 0  # Slots are not reused; they are only lost when an article is re-indexed
+
+    def _new_slot(self, article_id):
+        if self.n_slots == len(self.lengths):
+            self.slot_ids = np.concatenate([self.slot_ids, np.zeros_like(self.slot_ids)])
+            self.lengths = np.concatenate([self.lengths, np.zeros_like(self.lengths)])
+        slot = self.n_slots
+        self.n_slots += 1
+        self.slots[article_id] = slot
+        self.slot_ids[slot] = article_id
+        return slot
+
+    def _weights(self, title, content):
+        weights = Counter()
+        for term in tokenize(title):
+            weights[term] += self.title_weight
+        for term in tokenize(content):
+            weights[term] += 1
+        return weights
+
+    def _add(self, article_id, weights):
+        """Index one article; returns the terms that are new to the vocabulary"""
+        self._remove(article_id)
+        slot = self._new_slot(article_id)
+        new_terms = []
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                new_terms.append(term)
+            postings[slot] = weight
+            self._compiled.pop(term, None)
+        self.doc_terms[slot] = list(weights)
+        self.lengths[slot] = sum(weights.values())
+        self.total_length += float(self.lengths[slot])
+        return new_terms
+
+    def add(self, article_id, title, content):
+        weights = self._weights(title, content)
+        with self._lock:
+            for term in self._add(article_id, weights):
+                bisect.insort(self.vocabulary, term)
+
+    def add_many(self, articles):
+        """Bulk add of (article_id, title, content); the vocabulary is re-sorted once instead of per new term"""
+        weighted = [(article_id, self._weights(title or "", content or "")) for article_id, title, content in articles]
+        with self._lock:
+            new_terms = [term for article_id, weights in weighted for term in self._add(article_id, weights)]
+            if new_terms:
+                self.vocabulary = sorted(self.postings)
+
+    def remove(self, article_id):
+        with self._lock:
+            self._remove(article_id)
+
+    def _postings_arrays(self, term):
+        compiled = self._compiled.get(term)
+        if compiled is None:
+            postings = self.postings[term]
+            compiled = self._compiled[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+        return compiled
+
+    def expand_prefix(self, prefix, limit=SEARCH_PREFIX_EXPANSIONS):
+        """Vocabulary terms starting with prefix, most common first"""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff", lo=start)
+        terms = self.vocabulary[start:end]
+        if len(terms) > limit:
+            terms = heapq.nlargest(limit, terms, key=lambda term: len(self.postings[term]))
+        return terms
+
+    def search(self, query, page=1, page_size=10, prefix=False):
+        """(total hits, [(article_id, score)] for the requested page), best first.
+
+        With prefix=True the last query word may be incomplete and matches any term it
+        starts; the other words must match exactly.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+
+        with self._lock:
+            n_docs = len(self.doc_terms)
+            if n_docs == 0:
+                return 0, []
+            avg_length = self.total_length / n_docs
+
+            query_terms = set(terms[:-1])
+            query_terms.update(self.expand_prefix(terms[-1]) if prefix else [terms[-1]])
+
+            scores = np.zeros(self.n_slots, dtype=np.float32)
+            for term in query_terms:
+                if term not in self.postings:
+                    continue
+                slots, tfs = self._postings_arrays(term)
+                idf = math.log(1 + (n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+                norms = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[slots] / avg_length)
+                scores[slots] += idf * tfs * (BM25_K1 + 1) / (tfs + norms)
+            slot_ids = self.slot_ids[:self.n_slots]
+
+        matched = np.flatnonzero(scores)
+        wanted = min(page * page_size, len(matched))
+        if wanted == 0:
+            return len(matched), []
+        best = matched
+        if wanted < len(matched):  # Keep everything tied with the cut-off score so pages stay consistent
+            cutoff = -np.partition(-scores[matched], wanted - 1)[wanted - 1]
+            best = matched[scores[matched] >= cutoff]
+        best = best[np.lexsort((slot_ids[best], -scores[best]))][:wanted]  # Ties go to the older article
+        page_slots = best[(page - 1) * page_size:]
+        return len(matched), [(int(slot_ids[slot]), float(scores[slot])) for slot in page_slots]
+
+    def catch_up(self, batch_size=1000, lookback=SEARCH_CATCH_UP_LOOKBACK):
+        """Index DB articles above the watermark (less a short lookback) this worker is missing; returns how many"""
+        db = SessionLocal()
+        try:
+            ids = [article_id for (article_id,) in db.query(Article.id).filter(Article.id > self.watermark - lookback)]
+            with self._lock:
+                missing = [article_id for article_id in ids if article_id not in self.slots]
+            for start in range(0, len(missing), batch_size):
+                self.add_many(
+                    db.query(Article.id, Article.title, Article.content)
+                    .filter(Article.id.in_(missing[start:start + batch_size]))
+                    .all()
+                )
+        finally:
+            db.close()
+        self.watermark = max([self.watermark, *ids])
+        self.last_catch_up = time.time()
+        self.caught_up_count += len(missing)
+        return len(missing)
+
+    def _catch_up_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.catch_up()
+            except Exception as e:
+                print(f"Search index catch-up failed: {e}")
+
+    def start_catch_up(self, interval=SEARCH_CATCH_UP_INTERVAL):
+        if interval > 0 and self._catch_up_thread is None:
+            self._catch_up_thread = threading.Thread(target=self._catch_up_loop, args=(interval,), name="search-catch-up", daemon=True)
+            self._catch_up_thread.start()
+
+    def build_from_db(self, batch_size=1000):
+        """Index every article, reading the table in primary-key order a batch at a time"""
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            last_id = 0
+            while True:
+                rows = (
+                    db.query(Article.id, Article.title, Article.content)
+                    .filter(Article.id > last_id)
+                    .order_by(Article.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                self.add_many(rows)
+                last_id = rows[-1].id
+            self.watermark = max(self.watermark, last_id)
+        finally:
+            db.close()
+        print(f"Search index built over {len(self)} articles in {time.perf_counter() - start:.2f}s")
+        self.last_catch_up = time.time()
+        self.start_catch_up()
+        return self
+
+    def stats(self):
+        return {
+            "articles": len(self),
+            "terms": len(self.postings),
+            "caught_up": self.caught_up_count,
+            "watermark": self.watermark,
+            "seconds_since_catch_up": round(time.time() - self.last_catch_up, 1) if self.last_catch_up else None,
+        }
+
+
+search_index = SearchIndex()  # Accepts publishes immediately; the lazy loader fills in the existing articles
+search_loader = lazy("search_index", search_index.build_from_db)
@@ -16,6 +16,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 window.location.href = `index.html?search=${encodeURIComponent(query)}`;
             }
         });
+        initSearchSuggestions(document.getElementById('search-input'));
     }
 
     switch(currentPage) {
@@ -77,36 +78,49 @@ function initIndexPage() {
 }
 
 
-async function loadArticles() {
+async function loadArticles(page = 1) {
     const articleList = document.getElementById('article-list');
-    const searchQuery = getUrlParameter('search')?.toLowerCase() || '';
+    const searchQuery = getUrlParameter('search') || '';
 
     try {
-        articleList.innerHTML = '<div class="loading">Loading articles...</div>';
+        if (page === 1) {
+            articleList.innerHTML = '<div class="loading">Loading articles...</div>';
+        }
 
-        const response = await fetch('/articles');
+        const response = await fetch(searchQuery
+            ? `/search?q=${encodeURIComponent(searchQuery)}&page=${page}&page_size=10`
+            : '/articles');
         if (!response.ok) throw new Error('Failed to fetch articles');
 
-        const articles = await response.json();
-
-        const filtered = searchQuery
-            ? articles.filter(article =>
-                  article.title?.toLowerCase().includes(searchQuery) ||
-                  article.content?.toLowerCase().includes(searchQuery)
-              )
-            : articles;
-
-        if (filtered.length === 0) {
-            articleList.innerHTML = '<div class="error">No matching articles found.</div>';
-            return;
+        const data = await response.json();
+        const articles = searchQuery ? data.results : data;
+
+        if (page === 1) {
+            articleList.innerHTML = '';
+            if (articles.length === 0) {
+                articleList.innerHTML = searchQuery
+                    ? '<div class="error">No matching articles found.</div>'
+                    : '<div class="error">No articles yet.</div>';
+                return;
+            }
         }
 
-        articleList.innerHTML = '';
-        filtered.forEach(article => {
+        document.getElementById('more-results')?.remove();
+        articles.forEach(article => {
             const articleElement = createArticleElement(article);
             articleList.appendChild(articleElement);
         });
 
+        // Search results are paginated server-side; offer the next page while there is one
+        if (searchQuery && page * data.page_size < data.total) {
+            const moreButton = document.createElement('button');
+            moreButton.id = 'more-results';
+            moreButton.className = 'action-btn';
+            moreButton.textContent = 'More results';
+            moreButton.addEventListener('click', () => loadArticles(page + 1));
+            articleList.appendChild(moreButton);
+        }
+
     } catch (error) {
         console.error('Error loading articles:', error);
         articleList.innerHTML = '<div class="error">Error loading articles. Please try again later.</div>';
@@ -114,6 +128,44 @@ async function loadArticles() {
 }
 
 
+// Typeahead: suggest matching article titles while the user types in the navbar search box
+function initSearchSuggestions(searchInput) {
+    const suggestions = document.createElement('datalist');
+    suggestions.id = 'search-suggestions';
+    searchInput.setAttribute('list', suggestions.id);
+    searchInput.setAttribute('autocomplete', 'off');
+    searchInput.after(suggestions);
+
+    let debounceTimer = null;
+    let latestRequest = 0;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(debounceTimer);
+        const query = searchInput.value.trim();
+        if (query.length < 2) {
+            suggestions.innerHTML = '';
+            return;
+        }
+
+        debounceTimer = setTimeout(async () => {
+            const requestId = ++latestRequest;
+            try {
+                const response = await fetch(`/search?q=${encodeURIComponent(query)}&prefix=true&page_size=5`);
+                if (!response.ok || requestId !== latestRequest) return;  // Drop responses to older keystrokes
+                const data = await response.json();
+                suggestions.innerHTML = '';
+                data.results.forEach(result => {
+                    const option = document.createElement('option');
+                    option.value = result.title;
+                    suggestions.appendChild(option);
+                });
+            } catch (error) {
+                console.error('Search suggestion error:', error);
+            }
+        }, 150);
+    });
+}
+
+
 function createArticleElement(article) {
     const articleDiv = document.createElement('div');
     articleDiv.className = 'article-item';
@@ -134,8 +186,7 @@ function createArticleElement(article) {
 
     const preview = document.createElement('div');
     preview.className = 'article-preview';
-    const content = article.content || '';
-    preview.textContent = content.length > 200 ? content.substring(0, 200) + '...' : content;
+    preview.textContent = article.excerpt || '';
 
     // Assemble
     articleDiv.appendChild(title);
@@ -296,6 +347,7 @@ function initWritePage() {
 async function handleGenerateArticle() {
     const title = document.getElementById('title').value;
     const numSimilarArticles = parseInt(document.getElementById('num_similar_articles').value) || 3;
+    const contentField = document.getElementById('content');
     
     if (!title.trim()) {
         showMessage('generation-message', 'Please enter a title first', true);
@@ -304,9 +356,9 @@ async function handleGenerateArticle() {
     
     try {
         hideMessage('generation-message');
-        showMessage('generation-message', 'Generating article...');
+        showMessage('generation-message', 'Finding reference articles...');
         
-        const response = await fetch('/articles/generate', {
+        const response = await fetch('/articles/generate/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -320,14 +372,27 @@ async function handleGenerateArticle() {
             })
         });
         
-        if (response.ok) {
-            const data = await response.json();
-            document.getElementById('content').value = data.content || data.generated_content || '';
-            showMessage('generation-message', 'Article generated successfully!');
-        } else {
+        if (!response.ok) {
             const errorData = await response.json();
             showMessage('generation-message', errorData.detail || 'Generation failed', true);
+            return;
         }
+
+        contentField.value = '';
+        await readEventStream(response, (eventName, data) => {
+            if (eventName === 'retrieval') {
+                showMessage('generation-message', `Writing article... (references found in ${data.retrieval_time_seconds}s)`);
+            } else if (eventName === 'token') {
+                contentField.value += data.text;
+                contentField.scrollTop = contentField.scrollHeight;
+            } else if (eventName === 'done') {
+                showMessage('generation-message', data.cached
+                    ? 'Article generated successfully!'
+                    : `Article generated successfully! (retrieval ${data.retrieval_time_seconds}s, generation ${data.generation_time_seconds}s)`);
+            } else if (eventName === 'error') {
+                showMessage('generation-message', data.detail || 'Generation failed', true);
+            }
+        });
         
     } catch (error) {
         console.error('Generation error:', error);
@@ -335,6 +400,33 @@ async function handleGenerateArticle() {
     }
 }
 
+// Parse a text/event-stream response body, calling onEvent(name, data) for each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (data) onEvent(eventName, JSON.parse(data));
+        }
+    }
+}
+
 async function handlePublishArticle(event) {
     event.preventDefault();
     
@@ -450,7 +542,7 @@ function displayRecommendedArticles(recommended) {
         
         const preview = document.createElement('div');
         preview.className = 'recommended-preview';
-        const text = item.clean_text || '';
+        const text = item.snippet || item.clean_text || '';
         preview.textContent = text.length > 200 ? text.substring(0, 200) + '...' : text;
         
         recommendedDiv.appendChild(title);
@@ -0,0 +1,48 @@
+import sys
+import os
+import time
+import argparse
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import recommend_module
+from recommend_module import recommend_articles, recommend_articles_batch
+from cache_module import ResultCache
+
+
+def run_benchmark(n_queries=2000, top_k=5, batch_sizes=(16, 64, 256, 1024)):
+    """Queries/sec for the single-query path versus the vectorized batch path, with caching disabled"""
+    recommend_module.recommend_cache = ResultCache("benchmark", max_size=0)
+    store = recommend_module.store.get()
+    recommend_module.index.get()  # Load everything before timing
+
+    queries = [store.get(row_id, "clean_title") for row_id in range(0, len(store), max(1, len(store) // n_queries))][:n_queries]
+
+    rows = []
+    start = time.perf_counter()
+    for query in queries:
+        recommend_articles(query, top_k)
+    seconds = time.perf_counter() - start
+    rows.append({"path": "single", "batch_size": 1, "queries_per_sec": len(queries) / seconds})
+
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(queries), batch_size):
+            recommend_articles_batch(queries[i:i + batch_size], top_k)
+        seconds = time.perf_counter() - start
+        rows.append({"path": "batch", "batch_size": batch_size, "queries_per_sec": len(queries) / seconds})
+
+    report = pd.DataFrame(rows)
+    report["speedup"] = report["queries_per_sec"] / report["queries_per_sec"].iloc[0]
+    print(f"{len(queries)} title queries, top_k={top_k}, index={recommend_module.index.get().name}")
+    print(report.to_string(index=False, float_format="%.1f"))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of batch vs single-query recommendations")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    run_benchmark(args.queries, args.top_k)
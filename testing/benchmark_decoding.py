@@ -0,0 +1,69 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nextword_module import nextword_model, nextword_tokenizer, generate_next_words, max_seq_len
+from decoding_module import StatefulDecoder
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(n_seeds=50, num_words=10, beam_width=4, seed_words=5):
+    """Tokens/sec of the window-based generate_next_words loop versus stateful decoding"""
+    df = pd.read_pickle('final_nlp_data.pkl')
+    titles = df['clean_title'].dropna().sample(n_seeds, random_state=42).tolist()
+    seeds = [" ".join(title.split()[:seed_words]) for title in titles]
+
+    model, tokenizer = nextword_model.get(), nextword_tokenizer.get()
+    decoder = StatefulDecoder(model, tokenizer)
+    decoder.greedy(seeds[:2], 2)  # Trace the tf.functions before timing
+    decoder.beam_search(seeds[:2], 2, beam_width)
+
+    legacy, legacy_seconds = timed(lambda: [generate_next_words(seed, model, tokenizer, max_seq_len, num_words) for seed in seeds])
+    unbatched, unbatched_seconds = timed(lambda: [decoder.greedy([seed], num_words)[0] for seed in seeds])
+    batched, batched_seconds = timed(lambda: decoder.greedy(seeds, num_words))
+    _, beam_seconds = timed(lambda: decoder.beam_search(seeds, num_words, beam_width))
+    _, sample_seconds = timed(lambda: decoder.sample(seeds, num_words, top_k=40, top_p=0.9, seed=42))
+
+    def continuation(text, seed):
+        return text[len(seed):].split()
+
+    agreement = np.mean([
+        np.mean([a == b for a, b in zip(continuation(ref, seed), continuation(out, seed))] or [1.0])
+        for ref, out, seed in zip(legacy, batched, seeds)
+    ])
+    first_word = np.mean([continuation(ref, seed)[:1] == continuation(out, seed)[:1] for ref, out, seed in zip(legacy, batched, seeds)])
+
+    tokens = n_seeds * num_words
+    rows = [
+        ("generate_next_words (model.predict per word)", legacy_seconds),
+        ("stateful greedy, one seed at a time", unbatched_seconds),
+        (f"stateful greedy, {n_seeds} seeds batched", batched_seconds),
+        (f"stateful beam search (width {beam_width}), batched", beam_seconds),
+        ("stateful top-k/top-p sampling, batched", sample_seconds),
+    ]
+    report = pd.DataFrame([
+        {"decoder": name, "tokens_per_sec": round(tokens / seconds, 1), "speedup": round(legacy_seconds / seconds, 1)}
+        for name, seconds in rows
+    ])
+    return report, agreement, first_word
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare next-word decoding throughput")
+    parser.add_argument("--seeds", type=int, default=50)
+    parser.add_argument("--num-words", type=int, default=10)
+    parser.add_argument("--beam-width", type=int, default=4)
+    args = parser.parse_args()
+
+    report, agreement, first_word = run_benchmark(args.seeds, args.num_words, args.beam_width)
+    print(report.to_string(index=False))
+    print(f"\nGreedy agreement with generate_next_words: {agreement:.1%} of words, {first_word:.1%} of first words")
@@ -0,0 +1,56 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_module import load_sentence_transformer
+
+
+def embed_timed(model, texts, batch_size):
+    """Encode texts once to warm up, then time a full pass"""
+    model.encode(texts[:batch_size], batch_size=batch_size)
+    start = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    return embeddings, time.perf_counter() - start
+
+
+def run_benchmark(sample_size=2000, batch_size=32, backends=("torch", "onnx", "onnx-int8"), max_chars=1000):
+    """Compare embeddings/sec and cosine agreement with the fp32 model on a sample of the corpus"""
+    df = pd.read_pickle('final_nlp_data.pkl')
+    sample = df.sample(min(sample_size, len(df)), random_state=42)
+    texts = (sample['clean_title'] + "\n\n" + sample['clean_text'].str.slice(0, max_chars)).tolist()
+
+    reference = None
+    rows = []
+    for backend in backends:
+        model = load_sentence_transformer(backend)
+        embeddings, seconds = embed_timed(model, texts, batch_size)
+        if reference is None:
+            reference = embeddings  # First backend (fp32 torch by default) is the baseline
+        cosine = np.sum(embeddings * reference, axis=1)  # Both sides are L2-normalized
+        rows.append({
+            "backend": backend,
+            "embeddings_per_sec": len(texts) / seconds,
+            "speedup": None,
+            "cosine_mean": float(cosine.mean()),
+            "cosine_min": float(cosine.min()),
+        })
+
+    report = pd.DataFrame(rows)
+    report["speedup"] = report["embeddings_per_sec"] / report["embeddings_per_sec"].iloc[0]
+    print(f"{len(texts)} texts, batch size {batch_size}, baseline {backends[0]}")
+    print(report.to_string(index=False, float_format="%.4f"))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fp32, ONNX and int8 ONNX MiniLM embedders on CPU")
+    parser.add_argument("--sample", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    args = parser.parse_args()
+
+    run_benchmark(args.sample, args.batch_size, tuple(args.backends))
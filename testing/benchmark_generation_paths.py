@@ -0,0 +1,45 @@
+import sys
+import os
+import time
+import argparse
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate_module import ArticleGenerator
+from cache_module import ResultCache
+
+
+def run_benchmark(titles, num_similar_articles=3):
+    """Generate each title through the chain and direct paths and collect per-stage timings"""
+    generator = ArticleGenerator()
+    generator.load_vector_database()
+    generator.cache = ResultCache("benchmark", max_size=0)  # Never serve a cached article
+
+    # Cost of building the LangChain graph that the old code paid on every request
+    start = time.perf_counter()
+    generator._get_chain(num_similar_articles)
+    cold_build = time.perf_counter() - start
+    start = time.perf_counter()
+    generator._get_chain(num_similar_articles)
+    warm_build = time.perf_counter() - start
+    print(f"Chain build: cold {cold_build * 1000:.2f} ms, memoized {warm_build * 1000:.4f} ms")
+
+    rows = []
+    for path in ["chain", "direct"]:
+        generator.generation_path = path
+        for title in titles:
+            result = generator.generate_article(title, num_similar_articles)
+            rows.append({"title": title, "total_seconds": result["generation_time_seconds"], **result["timings"]})
+
+    report = pd.DataFrame(rows)
+    print(report.drop(columns=["title"]).groupby("path").mean(numeric_only=True).T.to_string(float_format="%.4f"))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-stage timings of the chain and direct generation paths")
+    parser.add_argument("titles", nargs="*", default=["AI in Healthcare", "The Future of Remote Work", "Climate Change and Agriculture"])
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    run_benchmark(args.titles, args.k)
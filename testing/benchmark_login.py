@@ -0,0 +1,87 @@
+import sys
+import os
+import time
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from auth_module import PasswordHasher, HashingBusyError, PASSWORD_HASH_WORKERS
+
+
+async def login_burst(hasher, stored, n_logins, concurrency):
+    """Concurrent verifications through the async path, as the login endpoints issue them"""
+    limiter = asyncio.Semaphore(concurrency)
+    latencies = []
+    rejected = 0
+
+    async def one():
+        nonlocal rejected
+        async with limiter:
+            start = time.perf_counter()
+            try:
+                await hasher.averify("correct horse battery staple", stored)
+            except HashingBusyError:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n_logins)))
+    return time.perf_counter() - start, latencies, rejected
+
+
+def run_benchmark(log2_n_values=(12, 13, 14, 15, 16), r=8, p=1, workers=PASSWORD_HASH_WORKERS,
+                  executor="thread", n_logins=200, concurrency=64, max_pending=64):
+    """Logins/sec and latency for each scrypt cost, so N can be sized for this machine"""
+    rows = []
+    for log2_n in log2_n_values:
+        hasher = PasswordHasher(n=2 ** log2_n, r=r, p=p, executor=executor, workers=workers, max_pending=max_pending)
+        stored = hasher.hash("correct horse battery staple")  # Also starts the pool
+
+        single = []
+        for _ in range(5):
+            start = time.perf_counter()
+            hasher.verify("correct horse battery staple", stored)
+            single.append(time.perf_counter() - start)
+
+        elapsed, latencies, rejected = asyncio.run(login_burst(hasher, stored, n_logins, concurrency))
+        ms = np.array(latencies) * 1000
+        rows.append({
+            "N": f"2^{log2_n}",
+            "memory_mb": round(128 * 2 ** log2_n * r / 2 ** 20, 1),
+            "single_ms": round(1000 * float(np.median(single)), 1),
+            "logins_per_sec": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(ms, 50)), 1) if len(ms) else None,
+            "p99_ms": round(float(np.percentile(ms, 99)), 1) if len(ms) else None,
+            "rejected": rejected,
+        })
+        hasher._get_executor().shutdown()
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Size the scrypt cost factor for login throughput on this machine")
+    parser.add_argument("--log2-n", type=int, nargs="+", default=[12, 13, 14, 15, 16])
+    parser.add_argument("--r", type=int, default=8)
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--target-ms", type=float, default=100, help="Acceptable single-login hashing time")
+    args = parser.parse_args()
+
+    df = run_benchmark(args.log2_n, args.r, args.p, args.workers, args.executor, args.logins, args.concurrency, args.max_pending)
+    print(f"{args.executor} pool, {args.workers} workers, {args.concurrency} concurrent logins\n")
+    print(df.to_string(index=False))
+
+    within = df[df["single_ms"] <= args.target_ms]
+    if len(within):
+        best = within.iloc[-1]
+        print(f"\nHighest cost within {args.target_ms:g} ms: N={best['N']} "
+              f"(~{best['logins_per_sec']} logins/sec). Set PASSWORD_SCRYPT_N={2 ** int(best['N'][2:])}")
+    else:
+        print(f"\nNo tested N hashes within {args.target_ms:g} ms; try smaller values or more workers")
@@ -0,0 +1,44 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ngram_module import ngram_model
+
+
+def run_benchmark(n_seeds=200, num_words=3, seed_words=5):
+    """Per-request and per-word latency of the n-gram engine on title prefixes"""
+    df = pd.read_pickle('final_nlp_data.pkl')
+    titles = df['clean_title'].dropna().sample(n_seeds, random_state=42).tolist()
+    seeds = [" ".join(title.split()[:seed_words]) for title in titles]
+
+    start = time.perf_counter()
+    model = ngram_model.get()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for seed in seeds:
+        start = time.perf_counter()
+        model.generate_next_words(seed, num_words)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1e6
+    return {
+        "load_ms": round(load_ms, 1),
+        "p50_us": round(float(np.percentile(latencies, 50)), 1),
+        "p99_us": round(float(np.percentile(latencies, 99)), 1),
+        "us_per_word": round(float(latencies.mean()) / num_words, 1),
+        "examples": [model.generate_next_words(seed, num_words) for seed in seeds[:3]],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure n-gram autocomplete latency")
+    parser.add_argument("--seeds", type=int, default=200)
+    parser.add_argument("--num-words", type=int, default=3)
+    args = parser.parse_args()
+
+    for key, value in run_benchmark(args.seeds, args.num_words).items():
+        print(f"{key}: {value}")
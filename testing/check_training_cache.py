@@ -0,0 +1,118 @@
+import sys
+import os
+import pickle
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from training_data_module import TokenizedCorpus, NextWordSequenceBatches, MIN_SENTENCE_WORDS
+from nextword_module import max_seq_len
+
+SENTENCES = [
+    "The model reads every article once before training starts.",
+    "Tokenized sentences are cached on disk as flat arrays.",
+    "A second run opens the cache instead of tokenizing again.",
+    "Short one.",
+    "Batches are cut from the memory mapped tokens on demand.",
+    "Changing the tokenizer must invalidate the cached token ids.",
+    "Sequence windows are padded at the front like the notebook did.",
+]
+
+builds = []
+_build = TokenizedCorpus.build.__func__
+
+
+def counting_build(cls, *args):
+    builds.append(args)
+    return _build(cls, *args)
+
+
+TokenizedCorpus.build = classmethod(counting_build)
+
+
+def write_data(workdir, n_rows):
+    """A small final_nlp_data.pkl stand-in"""
+    rng = np.random.default_rng(7)
+    texts = [" ".join(rng.choice(SENTENCES, size=4)) for _ in range(n_rows)]
+    data_path = os.path.join(workdir, "data.pkl")
+    pd.DataFrame({"clean_text": texts}).to_pickle(data_path)
+    return data_path, texts
+
+
+def write_tokenizer(workdir, texts, num_words=None):
+    from tensorflow.keras.preprocessing.text import Tokenizer
+
+    tokenizer = Tokenizer(num_words=num_words, oov_token="<OOV>")
+    tokenizer.fit_on_texts(texts)
+    tokenizer_path = os.path.join(workdir, "tokenizer.pkl")
+    with open(tokenizer_path, "wb") as f:
+        pickle.dump(tokenizer, f)
+    return tokenizer_path, tokenizer
+
+
+def in_memory_samples(texts, tokenizer):
+    """The notebook's path: every prefix n-gram of every sentence, pre-padded, split into (x, y)"""
+    from nltk.tokenize import sent_tokenize
+
+    window = max_seq_len - 1
+    xs, ys = [], []
+    sentences = [s for text in texts for s in sent_tokenize(text) if len(s.split()) >= MIN_SENTENCE_WORDS]
+    for seq in tokenizer.texts_to_sequences(sentences):
+        for i in range(1, len(seq)):
+            prefix = seq[max(0, i - window):i]
+            xs.append([0] * (window - len(prefix)) + prefix)
+            ys.append(seq[i])
+    return np.array(xs, dtype=np.int32), np.array(ys, dtype=np.int32)
+
+
+def batched_samples(corpus, **kwargs):
+    batches = NextWordSequenceBatches(corpus, batch_size=16, **kwargs)
+    parts = [batches[i] for i in range(len(batches))]
+    return np.concatenate([x for x, _ in parts]), np.concatenate([y for _, y in parts])
+
+
+def check(n_rows=500, workers=2):
+    workdir = tempfile.mkdtemp(prefix="nextword-cache-")
+    cache_path = os.path.join(workdir, "corpus")
+    try:
+        data_path, texts = write_data(workdir, n_rows)
+        tokenizer_path, tokenizer = write_tokenizer(workdir, texts)
+
+        first = TokenizedCorpus.open(data_path, tokenizer_path, cache_path, workers)
+        assert len(builds) == 1, "first open should build the cache"
+        second = TokenizedCorpus.open(data_path, tokenizer_path, cache_path, workers)
+        assert len(builds) == 1, "second open should reuse the cache"
+        assert np.array_equal(first.tokens, second.tokens) and np.array_equal(first.offsets, second.offsets)
+        print(f"cache hit on second open ({len(second)} sentences, {len(second.tokens)} tokens)")
+
+        x_ref, y_ref = in_memory_samples(texts, tokenizer)
+        x, y = batched_samples(second, shuffle=False)
+        assert np.array_equal(x, x_ref) and np.array_equal(y, y_ref), "batches differ from the in-memory samples"
+        x_shuffled, y_shuffled = batched_samples(second, shuffle=True)
+        reference = sorted(map(tuple, np.column_stack([x_ref, y_ref])))
+        assert sorted(map(tuple, np.column_stack([x_shuffled, y_shuffled]))) == reference, "shuffled epoch is not a permutation"
+        print(f"{len(y)} batched samples match the in-memory path, in order and shuffled")
+
+        _, smaller = write_tokenizer(workdir, texts, num_words=20)  # Same data file, different ids
+        third = TokenizedCorpus.open(data_path, tokenizer_path, cache_path, workers)
+        assert len(builds) == 2, "a changed tokenizer should rebuild the cache"
+        assert third.meta["tokenizer"] != second.meta["tokenizer"]
+        x, y = batched_samples(third, shuffle=False)
+        x_ref, y_ref = in_memory_samples(texts, smaller)
+        assert np.array_equal(x, x_ref) and np.array_equal(y, y_ref), "rebuilt cache holds stale ids"
+        print("changing the tokenizer rebuilt the cache")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the tokenized training cache: reuse, invalidation and batch equality")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    check(args.rows, args.workers)
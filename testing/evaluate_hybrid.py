@@ -0,0 +1,172 @@
+import sys
+import os
+import time
+import re
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache_module import normalize_query
+from hybrid_module import HybridRecommender, article_key, lexical_candidates, semantic_candidates
+
+
+WORD = re.compile(r"[a-z]+")
+
+
+def indexed_rows():
+    """Corpus rows whose article is in the vector store, so both retrievers can find the target"""
+    from generate_module import get_ready_generator
+    from recommend_module import store
+
+    docs = get_ready_generator().vector_store.docstore._dict.values()
+    indexed_titles = {normalize_query(doc.metadata.get("title", "")) for doc in docs}
+    article_store = store.get()
+    return article_store, [
+        row_id for row_id in range(len(article_store))
+        if normalize_query(article_store.get(row_id, "clean_title")) in indexed_titles
+    ]
+
+
+def target_keys(article_store, row_id):
+    return {("row", int(row_id)), ("title", normalize_query(article_store.get(int(row_id), "clean_title")))}  # Title-only stores match by title
+
+
+def paraphrase(sentence, article_words, rng, keep_fraction, wordnet, stop_words):
+    """Swap each content word for a WordNet synonym that never occurs in the article; keep the rest with keep_fraction"""
+    words = []
+    for word in WORD.findall(sentence.lower()):
+        if word in stop_words or len(word) < 3:
+            continue
+        synonyms = sorted({
+            lemma.name().replace("_", " ").lower() for synset in wordnet.synsets(word) for lemma in synset.lemmas()
+        } - {word})
+        synonyms = [s for s in synonyms if not set(WORD.findall(s)) & article_words]
+        if synonyms:
+            words.append(synonyms[int(rng.integers(len(synonyms)))])
+        elif rng.random() < keep_fraction:
+            words.append(word)
+    return " ".join(words)
+
+
+def paraphrased_queries(n_queries, keep_fraction=0.25, min_words=5, seed=123):
+    """Known-item queries that are not text from the index.
+
+    A random body sentence of the target article is reduced to its content words, each
+    swapped for a synonym absent from the article, so neither retriever can match it
+    verbatim; only keep_fraction of the words without such a synonym stay as they were.
+    """
+    import nltk
+    from nltk.corpus import wordnet, stopwords
+
+    for resource in ("wordnet", "stopwords"):
+        nltk.download(resource, quiet=True)
+    stop_words = set(stopwords.words("english"))
+
+    article_store, rows = indexed_rows()
+    rng = np.random.default_rng(seed)
+    queries = []
+    for row_id in rng.permutation(rows):
+        text = article_store.get(int(row_id), "clean_text")
+        sentences = [s for s in text.split(". ")[1:] if len(s.split()) >= 12]  # Skip the lead, which opens the first chunk
+        if not sentences:
+            continue
+        sentence = sentences[int(rng.integers(len(sentences)))]
+        query = paraphrase(sentence, set(WORD.findall(text.lower())), rng, keep_fraction, wordnet, stop_words)
+        if len(query.split()) < min_words:
+            continue
+        queries.append((query, target_keys(article_store, row_id)))
+        if len(queries) == n_queries:
+            break
+    return queries
+
+
+def file_queries(path):
+    """Hand-written queries from a JSONL file: {"query": ..., "titles": [...]} or {"query": ..., "row_ids": [...]}"""
+    from recommend_module import store
+
+    article_store = store.get()
+    queries = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            target = {("title", normalize_query(title)) for title in item.get("titles", [])}
+            for row_id in item.get("row_ids", []):
+                target |= target_keys(article_store, row_id)
+            queries.append((item["query"], target))
+    return queries
+
+
+def term_overlap(queries):
+    """Mean share of query words found in the relevant article's text; near 1 means the queries leak the index"""
+    from recommend_module import store
+
+    article_store = store.get()
+    shares = []
+    for query, target in queries:
+        rows = [value for kind, value in target if kind == "row"]
+        words = WORD.findall(query.lower())
+        if rows and words:
+            text_words = set(WORD.findall(article_store.get(rows[0], "clean_text").lower()))
+            shares.append(np.mean([word in text_words for word in words]))
+    return float(np.mean(shares)) if shares else float("nan")
+
+
+def score_run(ranked_keys, target, k):
+    for rank, key in enumerate(ranked_keys[:k]):
+        if key in target:
+            return 1.0, 1.0 / (rank + 1)
+    return 0.0, 0.0
+
+
+def evaluate(n_queries=300, k=5, queries_file=None, keep_fraction=0.25):
+    """Recall@k, MRR@k and latency for lexical-only, semantic-only and both fusion methods"""
+    recommender = HybridRecommender()
+    if queries_file:
+        queries, source = file_queries(queries_file)[:n_queries], queries_file
+    else:
+        queries, source = paraphrased_queries(n_queries, keep_fraction), "paraphrased"
+
+    systems = {
+        "lexical": lambda q: [key for key, _, _ in lexical_candidates(q, k)],
+        "semantic": lambda q: [key for key, _, _ in semantic_candidates(q, k)],
+        "hybrid-rrf": lambda q: [article_key(r) for r in recommender.recommend(q, k, "rrf")["recommendations"]],
+        "hybrid-weighted": lambda q: [article_key(r) for r in recommender.recommend(q, k, "weighted")["recommendations"]],
+    }
+
+    rows = []
+    for name, system in systems.items():
+        recalls, reciprocal_ranks, latencies = [], [], []
+        for query, target in queries:
+            start = time.perf_counter()
+            ranked = system(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            recall, rr = score_run(ranked, target, k)
+            recalls.append(recall)
+            reciprocal_ranks.append(rr)
+        rows.append({
+            "system": name,
+            f"recall@{k}": np.mean(recalls),
+            f"mrr@{k}": np.mean(reciprocal_ranks),
+            "p50_ms": np.percentile(latencies, 50),
+            "p99_ms": np.percentile(latencies, 99),
+        })
+
+    report = pd.DataFrame(rows)
+    print(f"{len(queries)} {source} queries, k={k}, {term_overlap(queries):.0%} of query words appear in the target article")
+    print(report.to_string(index=False, float_format="%.3f"))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline quality/latency evaluation of lexical, semantic and hybrid retrieval")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries-file", help="JSONL of hand-written queries with relevant titles or row_ids (default: paraphrased queries)")
+    parser.add_argument("--keep-fraction", type=float, default=0.25, help="Share of paraphrased words kept when no synonym is available")
+    args = parser.parse_args()
+
+    evaluate(args.queries, args.k, args.queries_file, args.keep_fraction)
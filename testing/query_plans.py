@@ -0,0 +1,73 @@
+import sys
+import os
+
+# Plans are checked on a throwaway in-memory SQLite database, whatever DATABASE_URL says
+os.environ["DATABASE_URL"] = "sqlite://"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import engine, SessionLocal
+from models import User, Article, Like, ArticleNeighbor
+from feed_module import list_query
+from migrate_db import migrate
+
+
+def seed(db, n_users=50, n_articles=2000):
+    db.add_all(User(id=i, username=f"user{i}", email=f"user{i}@example.com", hashed_password="x") for i in range(1, n_users + 1))
+    db.add_all(Article(id=i, title=f"Article {i}", content="text " * 50, author_id=i % n_users + 1) for i in range(1, n_articles + 1))
+    db.add_all(Like(user_id=i % n_users + 1, article_id=i) for i in range(1, n_articles + 1, 3))
+    db.add_all(ArticleNeighbor(article_id=i, rank=r, row_id=r, similarity=0.5) for i in range(1, 200) for r in range(5))
+    db.commit()
+    db.connection().exec_driver_sql("ANALYZE")  # Give the planner real row counts
+
+
+def hot_queries(db):
+    """The statements behind the hot endpoints, built the way main.py builds them"""
+    return {
+        "GET /articles/feed": list_query(db).filter(Article.id < 1000).order_by(Article.id.desc()).limit(11),
+        "GET /articles (random seek)": list_query(db).filter(Article.id >= 500).order_by(Article.id).limit(1),
+        "GET /users/{id}/articles": list_query(db).filter(Article.author_id == 7).order_by(Article.created_at.desc()),
+        "POST /articles/{id}/like (unlike)": db.query(Like).filter(Like.user_id == 7, Like.article_id == 42),
+        "GET /users/{id}/for-you (profile build)": db.query(Article).join(Like, Like.article_id == Article.id).filter(Like.user_id == 7),
+        "GET /articles/{id} (neighbors)": db.query(ArticleNeighbor.row_id, ArticleNeighbor.similarity)
+            .filter(ArticleNeighbor.article_id == 42).order_by(ArticleNeighbor.rank),
+    }
+
+
+def explain(db, query):
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def check_plan(plan):
+    """Problems in a plan: full scans of the big tables and sorts done outside an index"""
+    problems = []
+    for step in plan:
+        if step.startswith("SCAN") and "USING" not in step and any(f"SCAN {table}" in step for table in ("articles", "likes", "article_neighbors")):
+            problems.append(f"full table scan: {step}")
+        if "TEMP B-TREE" in step:
+            problems.append(f"sort not served by an index: {step}")
+    return problems
+
+
+def main():
+    migrate()
+    migrate()  # Second run must be a no-op
+    db = SessionLocal()
+    seed(db)
+
+    failures = 0
+    for name, query in hot_queries(db).items():
+        plan = explain(db, query)
+        problems = check_plan(plan)
+        print(f"{'FAIL' if problems else 'ok  '} {name}")
+        for step in plan:
+            print(f"       {step}")
+        for problem in problems:
+            print(f"     ! {problem}")
+        failures += bool(problems)
+
+    print(f"\n{failures} of {len(hot_queries(db))} hot queries have plan regressions")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recommend_index import SparseTopKScorer, NearestNeighborsIndex, FaissANNIndex
+
+
+def time_queries(index, query_vecs, k):
+    """Run every query one at a time, returning the results and per-query latency in ms"""
+    all_indices = []
+    latencies = []
+    for i in range(query_vecs.shape[0]):
+        start = time.perf_counter()
+        _, indices = index.search(query_vecs[i], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        all_indices.append(indices[0])
+    return np.array(all_indices), np.array(latencies)
+
+
+def recall_at_k(approx, exact):
+    """Fraction of the exact top-k that the approximate index also returned"""
+    hits = [len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)]
+    return float(np.mean(hits))
+
+
+def run_report(kinds, n_queries=500, k=5, nprobes=(1, 4, 16, 64), ef_searches=(16, 32, 64, 128)):
+    """Compare each ANN backend against brute-force search on titles drawn from the corpus"""
+    tfidf = joblib.load('models/tfidf_vectorizer.pkl')
+    tfidf_matrix = joblib.load('models/tfidf_matrix.pkl')
+    df = pd.read_pickle('final_nlp_data.pkl')
+
+    queries = df['clean_title'].sample(n_queries, random_state=7).tolist()
+    query_vecs = tfidf.transform(queries)
+
+    brute = SparseTopKScorer(tfidf_matrix)
+    exact, brute_latency = time_queries(brute, query_vecs, k)
+
+    rows = [{
+        "index": "brute", "params": "-", "recall@k": 1.0,
+        "p50_ms": np.percentile(brute_latency, 50), "p99_ms": np.percentile(brute_latency, 99),
+    }]
+
+    if os.path.exists('models/nearest_neighbors.pkl'):
+        # The sparse scorer replaced sklearn's kneighbors; confirm it still returns the same articles
+        nn_index = NearestNeighborsIndex(joblib.load('models/nearest_neighbors.pkl'))
+        nn_results, nn_latency = time_queries(nn_index, query_vecs, k)
+        rows.append({
+            "index": "nn (sklearn)", "params": "-", "recall@k": recall_at_k(nn_results, exact),
+            "p50_ms": np.percentile(nn_latency, 50), "p99_ms": np.percentile(nn_latency, 99),
+        })
+
+    for kind in kinds:
+        ann = FaissANNIndex.load(kind, tfidf_matrix)
+        sweep = [("nprobe", v) for v in nprobes] if kind == "ivf" else [("efSearch", v) for v in ef_searches]
+        for param, value in sweep:
+            if param == "nprobe":
+                ann.set_search_params(nprobe=value)
+            else:
+                ann.set_search_params(ef_search=value)
+            approx, latency = time_queries(ann, query_vecs, k)
+            rows.append({
+                "index": kind, "params": f"{param}={value}", "recall@k": recall_at_k(approx, exact),
+                "p50_ms": np.percentile(latency, 50), "p99_ms": np.percentile(latency, 99),
+            })
+
+    report = pd.DataFrame(rows)
+    print(f"Recall@{k} vs latency over {n_queries} title queries ({tfidf_matrix.shape[0]} articles)")
+    print(report.to_string(index=False, float_format="%.3f"))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall-vs-latency report for recommendation index backends")
+    parser.add_argument("--kinds", nargs="+", default=["ivf", "hnsw"])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Optional CSV path for the report")
+    args = parser.parse_args()
+
+    report = run_report(args.kinds, n_queries=args.queries, k=args.k)
+    if args.output:
+        report.to_csv(args.output, index=False)
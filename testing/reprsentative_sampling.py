@@ -6,13 +6,16 @@ import re
 import nltk
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import MiniBatchKMeans
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import gc
+import sys
 from tqdm import tqdm
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_module import load_sentence_transformer, EMBEDDING_BACKEND
+
 class RepresentativeSampler:
-    def __init__(self, input_file, output_dir, chunk_size=10000, batch_size=32):
+    def __init__(self, input_file, output_dir, chunk_size=10000, batch_size=32, backend=EMBEDDING_BACKEND):
         """
         Initialize the representative sampler.
         
@@ -21,12 +24,13 @@ class RepresentativeSampler:
             output_dir: Directory to save outputs
             chunk_size: Number of samples to process at once
             batch_size: Batch size for the sentence transformer
+            backend: Embedding runtime ("torch", "onnx" or "onnx-int8")
         """
         self.input_file = input_file
         self.output_dir = output_dir
         self.chunk_size = chunk_size
         self.batch_size = batch_size
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model = load_sentence_transformer(backend)
         
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
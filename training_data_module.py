@@ -0,0 +1,242 @@
+import os
+import json
+import math
+import time
+import pickle
+import shutil
+import hashlib
+import argparse
+import numpy as np
+from multiprocessing import Pool
+from dotenv import load_dotenv
+
+from nextword_module import MODEL_PATH, TOKENIZER_PATH, max_seq_len
+
+load_dotenv()
+
+TRAINING_CACHE_PATH = os.getenv("TRAINING_CACHE_PATH", "models/nextword_corpus")
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", str(os.cpu_count() or 1)))
+ROWS_PER_TASK = 200  # DataFrame rows handed to a worker at a time
+MIN_SENTENCE_WORDS = 4  # The notebook keeps sentences with more than 3 words
+
+_worker_tokenizer = None
+
+
+def _init_worker(tokenizer_path):
+    global _worker_tokenizer
+    with open(tokenizer_path, "rb") as f:
+        _worker_tokenizer = pickle.load(f)
+
+
+def _tokenize_rows(texts):
+    """Sentence-split and tokenize a chunk of rows: (flat int32 ids, int32 sentence lengths)"""
+    from nltk.tokenize import sent_tokenize
+
+    sentences = [s for text in texts if isinstance(text, str) for s in sent_tokenize(text) if len(s.split()) >= MIN_SENTENCE_WORDS]
+    sequences = [seq for seq in _worker_tokenizer.texts_to_sequences(sentences) if len(seq) > 1]  # One token gives no pair
+    lengths = np.fromiter((len(seq) for seq in sequences), dtype=np.int32, count=len(sequences))
+    ids = np.fromiter((i for seq in sequences for i in seq), dtype=np.int32, count=int(lengths.sum()))
+    return ids, lengths
+
+
+def tokenizer_fingerprint(tokenizer):
+    """Changes whenever the tokenizer would produce different ids"""
+    config = [tokenizer.num_words, tokenizer.oov_token, tokenizer.filters, tokenizer.lower, tokenizer.split,
+              len(tokenizer.word_index), sorted(tokenizer.word_index.items(), key=lambda item: item[1])[:20000]]
+    return hashlib.sha1(json.dumps(config, default=str).encode()).hexdigest()
+
+
+class TokenizedCorpus:
+    """Every training sentence as token ids, in two memory-mapped files.
+
+    ``tokens.int32`` holds all sentences back to back and ``offsets.int64`` where each one
+    starts (plus the end). Built once by sharding rows across processes; later runs with the
+    same data file and tokenizer open the files directly and skip tokenization.
+    """
+
+    def __init__(self, path=TRAINING_CACHE_PATH):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.tokens = np.memmap(os.path.join(path, "tokens.int32"), dtype=np.int32, mode="r")
+        self.offsets = np.memmap(os.path.join(path, "offsets.int64"), dtype=np.int64, mode="r")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @staticmethod
+    def source_meta(data_path, tokenizer):
+        stat = os.stat(data_path)
+        return {"data_path": os.path.abspath(data_path), "data_size": stat.st_size, "data_mtime": int(stat.st_mtime),
+                "tokenizer": tokenizer_fingerprint(tokenizer), "min_sentence_words": MIN_SENTENCE_WORDS}
+
+    @classmethod
+    def open(cls, data_path="final_nlp_data.pkl", tokenizer_path=TOKENIZER_PATH, path=TRAINING_CACHE_PATH,
+             workers=TRAINING_WORKERS, rebuild=False):
+        """Open the cache, (re)building it if the data file or the tokenizer changed"""
+        with open(tokenizer_path, "rb") as f:
+            expected = cls.source_meta(data_path, pickle.load(f))
+        meta_path = os.path.join(path, "meta.json")
+        if not rebuild and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if {key: value for key, value in json.load(f).items() if key in expected} == expected:
+                    return cls(path)
+            print(f"{path} was built from a different data file or tokenizer; rebuilding")
+        cls.build(data_path, tokenizer_path, path, workers, expected)
+        return cls(path)
+
+    @classmethod
+    def build(cls, data_path, tokenizer_path, path, workers, meta):
+        """Tokenize in worker processes and append each chunk to the token file as it arrives, in row order"""
+        import pandas as pd
+
+        start = time.time()
+        texts = pd.read_pickle(data_path)["clean_text"].tolist()  # Only the column is kept once loaded
+        chunks = (texts[i:i + ROWS_PER_TASK] for i in range(0, len(texts), ROWS_PER_TASK))
+
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        n_tokens, lengths = 0, []
+        with open(os.path.join(tmp_path, "tokens.int32"), "wb") as token_file, \
+                Pool(workers, initializer=_init_worker, initargs=(tokenizer_path,)) as pool:
+            for ids, chunk_lengths in pool.imap(_tokenize_rows, chunks):
+                token_file.write(ids.tobytes())
+                n_tokens += len(ids)
+                lengths.append(chunk_lengths)
+
+        lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int32)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        offsets.tofile(os.path.join(tmp_path, "offsets.int64"))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({**meta, "rows": len(texts), "sentences": len(lengths), "tokens": n_tokens,
+                       "samples": n_tokens - len(lengths)}, f)
+
+        old_path = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        print(f"Tokenized {len(texts)} rows into {len(lengths)} sentences ({n_tokens} tokens) "
+              f"with {workers} workers in {time.time() - start:.1f}s")
+
+
+def coprime_step(n, rng):
+    """A random step coprime with n, so (step * k + shift) % n visits every k once"""
+    while True:
+        step = int(rng.integers(1, n)) if n > 1 else 1
+        if math.gcd(step, n) == 1:
+            return step
+
+
+class NextWordSequenceBatches:
+    """Batches of (pre-padded int32 windows, int32 next-word ids) cut from a TokenizedCorpus.
+
+    Sample k is "every word of some sentence after its first", exactly the prefix n-grams
+    the notebook's NGramSequenceGenerator listed, but nothing is materialized: a batch finds
+    its sentences with a binary search over per-sentence sample counts and gathers its
+    windows straight from the memory-mapped tokens. Targets are sparse ids, so train with
+    ``sparse_categorical_crossentropy`` instead of one-hot vectors the size of the vocabulary.
+    Shuffling permutes samples with a random coprime stride each epoch, which needs no
+    permutation array however large the corpus is.
+    """
+
+    def __init__(self, corpus, batch_size=128, max_seq_len=max_seq_len, sentences=None, shuffle=True, seed=42):
+        self.corpus = corpus
+        self.batch_size = batch_size
+        self.window_size = max_seq_len - 1
+        first, last = sentences or (0, len(corpus))
+        self.starts = np.asarray(corpus.offsets[first:last], dtype=np.int64)  # Sentence starts in corpus.tokens
+        counts = np.asarray(corpus.offsets[first + 1:last + 1], dtype=np.int64) - self.starts - 1
+        self.sample_offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.n_samples = int(self.sample_offsets[-1])
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.step, self.shift = 1, 0
+        self.on_epoch_end()
+
+    def __len__(self):
+        return math.ceil(self.n_samples / self.batch_size)
+
+    def on_epoch_end(self):
+        if self.shuffle and self.n_samples:
+            self.step = coprime_step(self.n_samples, self.rng)
+            self.shift = int(self.rng.integers(0, self.n_samples))
+
+    def __getitem__(self, idx):
+        samples = np.arange(idx * self.batch_size, min((idx + 1) * self.batch_size, self.n_samples), dtype=np.int64)
+        samples = (samples * self.step + self.shift) % self.n_samples  # Fits int64 for corpora under ~3e9 samples
+        sentence = np.searchsorted(self.sample_offsets, samples, side="right") - 1
+        targets = self.starts[sentence] + 1 + (samples - self.sample_offsets[sentence])  # Positions in corpus.tokens
+
+        positions = targets[:, None] - self.window_size + np.arange(self.window_size)  # The 29 tokens before each target
+        inside = positions >= self.starts[sentence][:, None]  # Earlier positions are pre-padding
+        x = np.where(inside, self.corpus.tokens[np.where(inside, positions, 0)], 0).astype(np.int32)
+        y = np.asarray(self.corpus.tokens[targets], dtype=np.int32)
+        return x, y
+
+
+def next_word_sequence(corpus, workers=1, **kwargs):
+    """NextWordSequenceBatches as a keras.utils.Sequence, so model.fit can prefetch batches in worker threads"""
+    from tensorflow.keras.utils import Sequence
+
+    class NextWordSequence(NextWordSequenceBatches, Sequence):
+        def __init__(self, corpus, **kwargs):
+            try:
+                Sequence.__init__(self, workers=workers)  # Keras 3 takes the prefetch settings here
+            except TypeError:
+                Sequence.__init__(self)
+            NextWordSequenceBatches.__init__(self, corpus, **kwargs)
+
+    return NextWordSequence(corpus, **kwargs)
+
+
+def build_model(tokenizer, window_size=max_seq_len - 1):
+    """The notebook's architecture; the output covers the ids the tokenizer can emit (num_words), not every word seen"""
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, Embedding, LSTM, Dense
+
+    vocab_size = min(tokenizer.num_words or len(tokenizer.word_index) + 1, len(tokenizer.word_index) + 1)
+    model = Sequential([
+        Input(shape=(window_size,), dtype='int32'),
+        Embedding(input_dim=vocab_size, output_dim=128),
+        LSTM(256, return_sequences=True),
+        LSTM(128),
+        Dense(128, activation='relu'),
+        Dense(vocab_size, activation='softmax')
+    ])
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def train(epochs=100, batch_size=256, validation_fraction=0.02, workers=TRAINING_WORKERS, rebuild=False):
+    from tensorflow.keras.callbacks import ModelCheckpoint
+
+    corpus = TokenizedCorpus.open(workers=workers, rebuild=rebuild)
+    with open(TOKENIZER_PATH, "rb") as f:
+        tokenizer = pickle.load(f)
+
+    split = len(corpus) - int(len(corpus) * validation_fraction)  # Whole sentences, so no window leaks across
+    train_data = next_word_sequence(corpus, batch_size=batch_size, sentences=(0, split), workers=workers)
+    validation_data = next_word_sequence(corpus, batch_size=batch_size, sentences=(split, len(corpus)), shuffle=False)
+    print(f"{train_data.n_samples} training and {validation_data.n_samples} validation samples")
+
+    model = build_model(tokenizer)
+    checkpoint = ModelCheckpoint(MODEL_PATH, monitor='val_loss', save_best_only=True)
+    model.fit(train_data, validation_data=validation_data if validation_data.n_samples else None,
+              epochs=epochs, callbacks=[checkpoint])
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tokenize final_nlp_data.pkl once and train the next-word model from the cache")
+    parser.add_argument("--epochs", type=int, default=100)  # As the notebook trained
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=TRAINING_WORKERS)
+    parser.add_argument("--rebuild", action="store_true", help="Re-tokenize even if the cache is current")
+    parser.add_argument("--tokenize-only", action="store_true")
+    args = parser.parse_args()
+
+    if args.tokenize_only:
+        print(TokenizedCorpus.open(workers=args.workers, rebuild=args.rebuild).meta)
+    else:
+        train(args.epochs, args.batch_size, workers=args.workers, rebuild=args.rebuild)
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "vector_db")  # Directory ArticleGenerator loads
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "16"))  # IVF cells visited per query
+VECTOR_INDEX_EF_SEARCH = int(os.getenv("VECTOR_INDEX_EF_SEARCH", "64"))  # HNSW search breadth
+
+INDEX_TYPES = ["flat", "ivf-flat", "ivf-pq", "hnsw"]
+EMBEDDINGS_FILE = "embeddings.f32"  # Raw float32 vectors kept next to the index for recall evaluation
+REPORT_FILE = "build_report.json"
+
+
+def apply_search_params(index, nprobe=VECTOR_INDEX_NPROBE, ef_search=VECTOR_INDEX_EF_SEARCH):
+    """Set query-time knobs on whatever index type was loaded; flat indexes have none"""
+    import faiss
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass  # Parameter does not apply to this index type
+
+
+def make_index(index_type, dim, nlist, pq_m, pq_bits, hnsw_m):
+    import faiss
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "ivf-flat":
+        return faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+    if index_type == "ivf-pq":
+        return faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, pq_m, pq_bits)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = 200
+        return index
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def iter_chunks(df, splitter, batch_size):
+    """Yield (texts, metadatas) batches of article chunks without materializing the whole corpus"""
+    texts, metadatas = [], []
+    for row_id, (title, text) in enumerate(zip(df['clean_title'], df['clean_text'])):
+        for chunk in splitter.split_text(f"Title: {title}\n\n{text}"):
+            texts.append(chunk)
+            metadatas.append({"title": title, "row_id": row_id})
+            if len(texts) == batch_size:
+                yield texts, metadatas
+                texts, metadatas = [], []
+    if texts:
+        yield texts, metadatas
+
+
+def build(index_type, output, data_path="final_nlp_data.pkl", sample=None, batch_size=1024,
+          nlist=None, pq_m=48, pq_bits=8, hnsw_m=32, train_size=50000):
+    import faiss
+    import pandas as pd
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_core.documents import Document
+    from embedding_module import load_base_embeddings
+
+    df = pd.read_pickle(data_path)
+    if sample is not None and len(df) > sample:
+        df = df.sample(sample, random_state=42)
+    df = df.reset_index(drop=True)
+    # Chunking matches the notebook and IndexingPipeline so all stores hold the same kind of document
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    embeddings = load_base_embeddings()
+    os.makedirs(output, exist_ok=True)
+
+    start = time.time()
+    dim = len(embeddings.embed_query("dimension probe"))
+    nlist = nlist or max(1, int(4 * np.sqrt(len(df) * 3)))  # ~3 chunks per article
+    index = make_index(index_type, dim, nlist, pq_m, pq_bits, hnsw_m)
+
+    batches = iter_chunks(df, splitter, batch_size)
+    pending = []
+    if not index.is_trained:
+        # Train on the leading batches, then add them like any other batch
+        train_vectors = []
+        for texts, metadatas in batches:
+            vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+            pending.append((texts, metadatas, vectors))
+            train_vectors.append(vectors)
+            if sum(len(v) for v in train_vectors) >= train_size:
+                break
+        train_start = time.time()
+        index.train(np.vstack(train_vectors))
+        print(f"Trained {index_type} on {sum(len(v) for v in train_vectors)} vectors in {time.time() - train_start:.1f}s")
+
+    docstore = {}
+    index_to_docstore_id = {}
+    raw_vectors = open(os.path.join(output, EMBEDDINGS_FILE), "wb")  # Appended per batch, read back with mmap
+
+    def add_batch(texts, metadatas, vectors):
+        offset = index.ntotal
+        index.add(vectors)
+        raw_vectors.write(vectors.tobytes())
+        for i, (text, metadata) in enumerate(zip(texts, metadatas)):
+            doc_id = str(offset + i)
+            docstore[doc_id] = Document(page_content=text, metadata=metadata)
+            index_to_docstore_id[offset + i] = doc_id
+
+    for texts, metadatas, vectors in pending:
+        add_batch(texts, metadatas, vectors)
+    for texts, metadatas in batches:
+        add_batch(texts, metadatas, np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+        print(f"Indexed {index.ntotal} chunks...", end="\r")
+
+    raw_vectors.close()
+    build_seconds = time.time() - start
+    FAISS(embeddings, index, InMemoryDocstore(docstore), index_to_docstore_id).save_local(output)
+
+    report = {
+        "index_type": index_type,
+        "articles": len(df),
+        "vectors": int(index.ntotal),
+        "dimension": dim,
+        "build_seconds": round(build_seconds, 2),
+        "index_bytes": int(faiss.serialize_index(index).nbytes),
+        "params": {"nlist": nlist, "pq_m": pq_m, "pq_bits": pq_bits, "hnsw_m": hnsw_m},
+    }
+    with open(os.path.join(output, REPORT_FILE), "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBuilt {index_type} index with {index.ntotal} vectors in {build_seconds:.1f}s -> {output}")
+    return report
+
+
+def evaluate(index_path, queries=500, k=10, nprobe=VECTOR_INDEX_NPROBE, ef_search=VECTOR_INDEX_EF_SEARCH):
+    """Recall@k against exact flat search over the same vectors, plus per-query latency"""
+    import faiss
+
+    index = faiss.read_index(os.path.join(index_path, "index.faiss"))
+    apply_search_params(index, nprobe, ef_search)
+    vectors = np.memmap(os.path.join(index_path, EMBEDDINGS_FILE), dtype=np.float32, mode="r").reshape(-1, index.d)
+
+    rng = np.random.default_rng(7)
+    query_rows = np.sort(rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False))
+    # Perturb the stored vectors slightly so queries are near, not identical to, indexed points
+    query_vectors = np.asarray(vectors[query_rows], dtype=np.float32)
+    query_vectors += rng.normal(scale=0.01, size=query_vectors.shape).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    for start in range(0, len(vectors), 100000):
+        exact.add(np.asarray(vectors[start:start + 100000], dtype=np.float32))
+    _, truth = exact.search(query_vectors, k)
+
+    latencies = []
+    hits = []
+    for i in range(len(query_vectors)):
+        start = time.perf_counter()
+        _, found = index.search(query_vectors[i:i + 1], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits.append(len(set(found[0]) & set(truth[i])) / k)
+
+    report = {}
+    report_path = os.path.join(index_path, REPORT_FILE)
+    if os.path.exists(report_path):
+        with open(report_path) as f:
+            report = json.load(f)
+    report.update({
+        "index_bytes": int(faiss.serialize_index(index).nbytes),
+        f"recall@{k}": round(float(np.mean(hits)), 4),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "nprobe": nprobe,
+        "ef_search": ef_search,
+    })
+    for key, value in report.items():
+        print(f"{key:>16}: {value}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and evaluate FAISS indexes for article generation retrieval")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Embed final_nlp_data.pkl in batches and build an index")
+    build_parser.add_argument("--type", choices=INDEX_TYPES, default="ivf-flat")
+    build_parser.add_argument("--output", required=True, help="Directory for index.faiss / index.pkl")
+    build_parser.add_argument("--data", default="final_nlp_data.pkl")
+    build_parser.add_argument("--sample", type=int, default=None, help="Only index this many articles")
+    build_parser.add_argument("--batch-size", type=int, default=1024, help="Chunks embedded per batch")
+    build_parser.add_argument("--nlist", type=int, default=None, help="IVF cells (default 4 * sqrt(chunks))")
+    build_parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-quantizers (must divide the dimension)")
+    build_parser.add_argument("--pq-bits", type=int, default=8)
+    build_parser.add_argument("--hnsw-m", type=int, default=32)
+    build_parser.add_argument("--train-size", type=int, default=50000, help="Vectors used to train IVF indexes")
+
+    eval_parser = commands.add_parser("evaluate", help="Report recall@k vs flat search and query latency")
+    eval_parser.add_argument("index_path")
+    eval_parser.add_argument("--queries", type=int, default=500)
+    eval_parser.add_argument("--k", type=int, default=10)
+    eval_parser.add_argument("--nprobe", type=int, default=VECTOR_INDEX_NPROBE)
+    eval_parser.add_argument("--ef-search", type=int, default=VECTOR_INDEX_EF_SEARCH)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build(args.type, args.output, args.data, args.sample, args.batch_size,
+              args.nlist, args.pq_m, args.pq_bits, args.hnsw_m, args.train_size)
+    else:
+        evaluate(args.index_path, args.queries, args.k, args.nprobe, args.ef_search)